@@ -0,0 +1,376 @@
+"""
+Offline batch mode.
+
+Runs a folder (or manifest) of recordings through the same STT -> LLM
+(-> TTS) modules the live assistant uses and writes one JSON line per
+recording with the transcript, the reply and per-stage timings. Use it to
+regression-test prompts or measure transcription quality on a corpus.
+
+Usage:
+    python batch.py recordings/ -o results.jsonl
+    python batch.py manifest.jsonl -o results.jsonl --tts-dir out/tts
+    python batch.py recordings/ -o results.jsonl --no-llm
+
+A manifest has one JSON object per line: {"audio": "clip.wav"} plus an
+optional "id" and a reference "text" (paths are relative to the manifest).
+A folder may contain a transcripts.json ({"clip.wav": "reference text"}).
+With references, each result gets a word error rate.
+
+Each stage has its own thread pool (see the ``batch`` section of
+config.yaml): several recordings are decoded at once by one Whisper model
+using its worker pool, and a bounded number of LLM requests are in flight
+while later recordings are still being transcribed. Whisper's batched
+pipeline (``stt_batch_size``) only batches the speech segments of one
+recording, so short recordings are decoded one per worker. A summary with
+throughput and stage percentiles is printed and saved next to the output
+as <name>.summary.json.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+import yaml
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.llm_handler import FALLBACK_RESPONSE, LLMHandler
+from modules.speech_to_text import SpeechToText
+from modules.text_utils import normalize_text
+from modules.tts_handler import TTSHandler
+
+SAMPLE_RATE = 16000
+
+
+def load_config(path: str) -> dict:
+    def resolve(value):
+        # Same ${VAR} expansion as main.py
+        if isinstance(value, dict):
+            return {k: resolve(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [resolve(v) for v in value]
+        if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
+            return os.getenv(value[2:-1], value)
+        return value
+
+    with open(path, "r") as f:
+        return resolve(yaml.safe_load(f))
+
+
+def load_wav(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Read a WAV file as mono int16 at ``sample_rate``"""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV is supported")
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        if wf.getnchannels() > 1:
+            samples = samples.reshape(-1, wf.getnchannels())[:, 0]
+    if rate != sample_rate:
+        n_out = int(len(samples) * sample_rate / rate)
+        samples = np.interp(np.arange(n_out) * rate / sample_rate, np.arange(len(samples)), samples).astype(np.int16)
+    return samples
+
+
+def load_items(source: str) -> list:
+    """Recordings to process as [{"id", "audio", "reference"?}]"""
+    items = []
+    if os.path.isdir(source):
+        references = {}
+        references_path = os.path.join(source, "transcripts.json")
+        if os.path.exists(references_path):
+            with open(references_path, "r") as f:
+                references = json.load(f)
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if not name.lower().endswith(".wav"):
+                    continue
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, source)
+                item = {"id": rel, "audio": path}
+                if rel in references:
+                    item["reference"] = references[rel]
+                items.append(item)
+        items.sort(key=lambda item: item["id"])
+        return items
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            item = {"id": entry.get("id", entry["audio"]), "audio": os.path.join(base, entry["audio"])}
+            if entry.get("text"):
+                item["reference"] = entry["text"]
+            items.append(item)
+    return items
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance divided by the reference length (after normalize_text)"""
+    ref = normalize_text(reference).split()
+    hyp = normalize_text(hypothesis).split()
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1] / len(ref)
+
+
+class BatchProcessor:
+    """
+    Pushes recordings through load -> STT -> LLM -> TTS.
+
+    Every stage runs on its own thread pool, so the pool sizes bound how
+    much of each kind of work runs at once, and up to ``max_in_flight``
+    recordings overlap across stages.
+    """
+
+    def __init__(self, config: dict, stt, llm=None, tts=None, tts_dir: str = None):
+        """
+        Args:
+            config: batch section from config.yaml
+            stt: SpeechToText
+            llm: LLMHandler, or None to only transcribe
+            tts: TTSHandler, or None to skip synthesis
+            tts_dir: Folder the synthesized replies are written to
+        """
+        self.logger = logging.getLogger("Batch")
+        self.stt = stt
+        self.llm = llm
+        self.tts = tts
+        self.tts_dir = tts_dir
+        self.max_in_flight = config.get("max_in_flight", 16)
+
+        self._executors = {
+            "load": concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="load"),
+            "stt": concurrent.futures.ThreadPoolExecutor(max_workers=config.get("stt_workers", 2), thread_name_prefix="stt"),
+            "llm": concurrent.futures.ThreadPoolExecutor(max_workers=config.get("llm_concurrency", 4), thread_name_prefix="llm"),
+            "tts": concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts"),
+        }
+        self._loop = None
+        self._slots = None
+
+    async def _run(self, stage: str, func, *args, timings: dict = None):
+        """
+        Run a blocking call on the stage's thread pool. With ``timings``,
+        the time spent queued for a worker is stored under "<stage>_wait"
+        and the call itself under "<stage>".
+        """
+        queued = time.monotonic()
+
+        def call():
+            started = time.monotonic()
+            try:
+                return func(*args)
+            finally:
+                if timings is not None:
+                    timings[f"{stage}_wait"] = started - queued
+                    timings[stage] = time.monotonic() - started
+
+        return await self._loop.run_in_executor(self._executors[stage], call)
+
+    async def process(self, index: int, item: dict) -> dict:
+        """Run one recording through every stage; errors are recorded, not raised"""
+        result = {"index": index, "id": item["id"], "audio": item["audio"]}
+        timings = result["timings"] = {}
+        async with self._slots:
+            start = time.monotonic()
+            try:
+                samples = await self._run("load", load_wav, item["audio"])
+                result["audio_seconds"] = round(len(samples) / SAMPLE_RATE, 3)
+
+                text = await self._run("stt", self.stt.transcribe, samples, SAMPLE_RATE, timings=timings)
+                result["transcript"] = text
+                if "reference" in item:
+                    result["reference"] = item["reference"]
+                    result["wer"] = round(word_error_rate(item["reference"], text), 4)
+                del samples
+
+                if self.llm is not None and text:
+                    reply = await self._run("llm", self.llm.generate_response, text, timings=timings)
+                    result["response"] = reply["response"]
+                    result["mood"] = reply["mood"]
+                    if reply["response"] == FALLBACK_RESPONSE:
+                        result["error"] = "llm request failed"
+
+                    if self.tts is not None and "error" not in result:
+                        result["tts_file"] = await self._run(
+                            "tts", self._synthesize_to_file, item["id"], reply["response"], timings=timings
+                        )
+            except Exception as e:
+                self.logger.error(f"{item['id']}: {e}")
+                result["error"] = str(e)
+            timings["total"] = time.monotonic() - start
+
+        result["timings"] = {k: round(v, 4) for k, v in timings.items()}
+        return result
+
+    def _synthesize_to_file(self, item_id: str, text: str) -> str | None:
+        samples = self.tts.synthesize(text)
+        if samples is None:
+            return None
+        path = os.path.join(self.tts_dir, os.path.splitext(item_id)[0].replace(os.sep, "_") + ".wav")
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.tts.sample_rate)
+            wf.writeframes(samples.tobytes())
+        return path
+
+    async def run(self, items: list, output) -> dict:
+        """
+        Process ``items``, writing each result to ``output`` (JSONL) as it
+        completes.
+
+        Returns:
+            dict: Summary with throughput and per-stage percentiles
+        """
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        results = []
+        start = time.monotonic()
+        try:
+            tasks = [asyncio.create_task(self.process(i, item)) for i, item in enumerate(items)]
+            for done in asyncio.as_completed(tasks):
+                result = await done
+                results.append(result)
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                status = result.get("error") or repr(result.get("transcript", ""))
+                print(f"[{len(results)}/{len(items)}] {result['id']}: {status}")
+        finally:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+        return self.summarize(results, time.monotonic() - start)
+
+    @staticmethod
+    def summarize(results: list, wall: float) -> dict:
+        audio_seconds = sum(r.get("audio_seconds", 0.0) for r in results)
+        summary = {
+            "items": len(results),
+            "errors": sum(1 for r in results if "error" in r),
+            "wall_seconds": round(wall, 3),
+            "items_per_second": round(len(results) / wall, 3) if wall > 0 else None,
+            "audio_seconds": round(audio_seconds, 3),
+            # Seconds of recordings processed per second of wall time
+            "speed_x_realtime": round(audio_seconds / wall, 3) if wall > 0 else None,
+            "stages": {},
+        }
+        for stage in ("stt", "stt_wait", "llm", "llm_wait", "tts", "total"):
+            values = np.array([r["timings"][stage] for r in results if stage in r["timings"]])
+            if len(values):
+                summary["stages"][stage] = {
+                    "count": len(values),
+                    "mean": round(float(values.mean()), 4),
+                    "p50": round(float(np.percentile(values, 50)), 4),
+                    "p95": round(float(np.percentile(values, 95)), 4),
+                    "max": round(float(values.max()), 4),
+                }
+        wers = [r["wer"] for r in results if "wer" in r]
+        if wers:
+            summary["mean_wer"] = round(float(np.mean(wers)), 4)
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a folder or manifest of recordings offline")
+    parser.add_argument("source", help="Folder of WAV files or a JSONL manifest")
+    parser.add_argument("-o", "--output", required=True, help="Results file (JSONL)")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--stt-workers", type=int, help="Recordings transcribed at once")
+    parser.add_argument("--llm-concurrency", type=int, help="LLM requests in flight at once")
+    parser.add_argument("--no-llm", action="store_true", help="Only transcribe")
+    parser.add_argument("--tts-dir", help="Render each reply to a WAV file in this folder")
+    parser.add_argument("--verbose", action="store_true", help="Log every module's INFO messages")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger("Batch")
+
+    config = load_config(args.config)
+    options = dict(config.get("batch", {}))
+    if args.stt_workers:
+        options["stt_workers"] = args.stt_workers
+    if args.llm_concurrency:
+        options["llm_concurrency"] = args.llm_concurrency
+
+    items = load_items(args.source)
+    if not items:
+        print(f"No recordings found in {args.source}")
+        return
+
+    stt_config = dict(config.get("stt", {}))
+    if stt_config.get("backend", "faster-whisper") == "sherpa-onnx":
+        # The streaming recognizer keeps per-utterance state; decode one at a time
+        options["stt_workers"] = 1
+    stt_config.update(num_workers=options.get("stt_workers", 2), batch_size=options.get("stt_batch_size", 8))
+    stt = SpeechToText(stt_config)
+    # Keep one-time setup out of the first recording's timings
+    stt.warm_up()
+
+    llm = None
+    if not args.no_llm:
+        # Every recording is an independent one-shot request: no history, no cache
+        llm_config = dict(config.get("llm", {}))
+        llm_config.update(
+            stream=False, max_history=0, summarize_history=False, response_cache={"enabled": False},
+            pool_size=options.get("llm_concurrency", 4),
+        )
+        llm = LLMHandler(llm_config)
+
+    tts = None
+    tts_dir = None
+    if llm is not None and (args.tts_dir or options.get("tts", False)):
+        tts_dir = args.tts_dir or os.path.splitext(args.output)[0] + "_tts"
+        os.makedirs(tts_dir, exist_ok=True)
+        tts = TTSHandler(config.get("tts", {}), None)
+        if tts.engine != "sherpa-onnx":
+            logger.warning("TTS files need the sherpa-onnx engine; skipping synthesis")
+            tts = None
+    processor = BatchProcessor(options, stt, llm, tts, tts_dir=tts_dir)
+
+    try:
+        with open(args.output, "w") as output:
+            summary = asyncio.run(processor.run(items, output))
+    except KeyboardInterrupt:
+        print("\nInterrupted; partial results are in the output file")
+        return
+    finally:
+        stt.cleanup()
+        if llm: llm.cleanup()
+        if tts: tts.cleanup()
+
+    summary["stt"] = stt.get_stats()
+    summary_path = os.path.splitext(args.output)[0] + ".summary.json"
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n{summary['items']} recordings ({summary['audio_seconds']:.0f}s of audio) in {summary['wall_seconds']:.1f}s: "
+          f"{summary['items_per_second']} items/s, {summary['speed_x_realtime']}x real time, {summary['errors']} errors")
+    for stage, d in summary["stages"].items():
+        print(f"  {stage:>8}: mean {d['mean'] * 1000:.0f}ms, p50 {d['p50'] * 1000:.0f}ms, "
+              f"p95 {d['p95'] * 1000:.0f}ms, max {d['max'] * 1000:.0f}ms")
+    if "mean_wer" in summary:
+        print(f"  WER: {summary['mean_wer']:.1%}")
+    print(f"Results: {args.output}, summary: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
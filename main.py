@@ -1,5 +1,8 @@
-import yaml
 import time
+STARTED = time.monotonic()  # before the imports below, for the startup report
+
+import asyncio
+import yaml
 import logging
 import sys
 import os
@@ -8,11 +11,16 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from modules.wake_word import WakeWordDetector
-from modules.audio_handler import AudioHandler
 from modules.speech_to_text import SpeechToText
+from modules.stt_worker import STTWorker
 from modules.llm_handler import LLMHandler
-from modules.display import DisplayController
 from modules.tts_handler import TTSHandler
+from modules.intent_router import IntentRouter
+from modules.vad import VoiceActivityDetector
+from modules.utterance import UtteranceConditioner
+from modules.orchestrator import Orchestrator
+from modules.tracing import Tracer
+from modules.startup import StartupLoader
 from dotenv import load_dotenv
 
 # Load environment variables from .env
@@ -50,132 +58,137 @@ def load_config(path="config.yaml"):
         logger.error(f"Failed to load config: {e}")
         sys.exit(1)
 
+def build_display(config):
+    try:
+        # luma and PIL are imported here, on the background loader, not before the wake word listens
+        from modules.display import DisplayController
+        return DisplayController(config.get("display", {}))
+    except Exception as e:
+        logger.warning(f"Display not initialized (likely not connected): {e}")
+        return None
+
+def build_components(config, components):
+    """
+    Initialize every module into ``components`` (so a partial setup can
+    still be cleaned up). Returns False if the assistant cannot start.
+
+    What the wake word needs (audio, VAD, wake word) is built right away.
+    The display, speech-to-text and TTS load and warm up in the background
+    while the assistant is already listening; their futures are in
+    ``components["loading"]`` and each is stored in ``components`` once
+    ready.
+    """
+    # Check for placeholder key (only Porcupine needs one)
+    access_key = config["wake_word"]["access_key"]
+    if config["wake_word"].get("backend", "porcupine") == "porcupine" and access_key == "YOUR_PORCUPINE_ACCESS_KEY":
+        logger.warning("Please set your Porcupine Access Key in config.yaml!")
+        print("\nERROR: Porcupine Access Key not set in config.yaml\n")
+        return False
+
+    startup = components["startup"] = StartupLoader(config.get("startup", {}).get("workers", 4), started=STARTED)
+    startup.mark("imports")
+    loading = components["loading"] = {}
+
+    def background(name, build, warm_up=None):
+        def store(component):
+            components[name] = component
+        loading[name] = startup.submit(name, build, warm_up, on_ready=store)
+
+    # Slow loads start first so they overlap with everything below
+    background("display", lambda: build_display(config))
+    stt_config = config.get("stt", {})
+    if stt_config.get("out_of_process", False) and stt_config.get("backend", "faster-whisper") == "faster-whisper":
+        background("stt", lambda: STTWorker(stt_config), warm_up=lambda stt: stt.warm_up())
+    else:
+        background("stt", lambda: SpeechToText(stt_config), warm_up=lambda stt: stt.warm_up())
+
+    vad = None
+    if config.get("vad", {}).get("enabled", False):
+        vad = VoiceActivityDetector(
+            config["vad"],
+            sample_rate=config["audio"].get("sample_rate", 16000),
+            frame_size=config["audio"].get("chunk_size", 512)
+        )
+    components["vad"] = vad
+    def build_audio():
+        # pyaudio's import is timed as part of bringing audio up
+        from modules.audio_handler import AudioHandler
+        return AudioHandler(config.get("audio", {}), vad=vad)
+
+    audio = components["audio"] = startup.run("audio", build_audio)
+    audio.set_pre_roll(config.get("recording", {}).get("pre_buffer_duration", 0.0))
+    background("tts", lambda: TTSHandler(config.get("tts", {}), audio),
+               warm_up=lambda tts: tts.warm_up(background=False))
+
+    # Trim recordings to speech and drop ones without any before they reach Whisper
+    recording_config = config.get("recording", {})
+    use_conditioner = vad is not None and recording_config.get("trim_silence", True)
+    components["conditioner"] = UtteranceConditioner(recording_config, vad) if use_conditioner else None
+
+    components["wake_word"] = startup.run(
+        "wake_word", lambda: WakeWordDetector.from_config(config["wake_word"]), warm_up=lambda w: w.warm_up()
+    )
+    # Warming up the LLM means opening the connection to the API
+    components["llm"] = startup.run("llm", lambda: LLMHandler(config.get("llm", {})), warm_up=lambda llm: llm.prewarm())
+
+    # Simple requests (time, volume, ...) are answered without the LLM
+    intent_config = config.get("intents", {})
+    components["router"] = IntentRouter(intent_config, audio) if intent_config.get("enabled", False) else None
+
+    # Per-turn latency traces (JSONL) and rolling percentiles (metrics file)
+    tracing_config = config.get("tracing", {})
+    components["tracer"] = Tracer(tracing_config) if tracing_config.get("enabled", False) else None
+    return True
+
+def cleanup_components(components):
+    logger.info("Cleaning up resources...")
+    # Let background loads finish so what they built gets released too
+    if components.get("startup"): components["startup"].shutdown()
+    if components.get("audio"): components["audio"].cleanup()
+    if components.get("wake_word"): components["wake_word"].cleanup()
+    if components.get("display"):
+        components["display"].clear()
+        components["display"].cleanup()
+    if components.get("stt"):
+        logger.info(f"STT: {components['stt'].get_stats()}")
+        components["stt"].cleanup()
+    if components.get("tts"): components["tts"].cleanup()
+    if components.get("llm"): components["llm"].cleanup()
+    if components.get("router"): logger.info(f"Intent routing: {components['router'].get_stats()}")
+    if components.get("conditioner"): logger.info(f"Utterances: {components['conditioner'].get_stats()}")
+
 def main():
     logger.info("Initializing Voice Assistant...")
     
     # Load configuration
     config = load_config()
-    
-    # Initialize modules with error handling
+    components = {}
+
     try:
+        # Initialize modules with error handling
         try:
-            display = DisplayController(config.get("display", {}))
+            if not build_components(config, components):
+                return
         except Exception as e:
-            logger.warning(f"Display not initialized (likely not connected): {e}")
-            display = None
-            
-        audio = AudioHandler(config.get("audio", {}))
-        
-        # Check for placeholder key
-        access_key = config["wake_word"]["access_key"]
-        if access_key == "YOUR_PORCUPINE_ACCESS_KEY":
-            logger.warning("Please set your Porcupine Access Key in config.yaml!")
-            print("\nERROR: Porcupine Access Key not set in config.yaml\n")
+            logger.critical(f"Initialization failed: {e}")
             return
 
-        wake_word = WakeWordDetector(
-            access_key,
-            config["wake_word"]["keyword"],
-            config["wake_word"]["sensitivity"]
-        )
-        
-        stt = SpeechToText(config.get("stt", {}))
-        llm = LLMHandler(config.get("llm", {}))
-        tts = TTSHandler(config.get("tts", {}), audio)
-        
-    except Exception as e:
-        logger.critical(f"Initialization failed: {e}")
-        return
+        # Start audio stream
+        try:
+            components["audio"].start_input_stream()
+            components["audio"].start_output_stream()
+        except Exception as e:
+            logger.critical(f"Failed to start audio: {e}")
+            return
+
+        asyncio.run(Orchestrator(config, components).run())
 
-    # Start audio stream
-    try:
-        audio.start_input_stream()
-    except Exception as e:
-        logger.critical(f"Failed to start audio: {e}")
-        return
-    
-    # Initial state
-    state = "IDLE"
-    display.show_idle_face()
-    print("\nVoice Assistant Ready! Say 'computer' to activate.\n")
-    
-    try:
-        while True:
-            if state == "IDLE":
-                # Read audio frame
-                frame = audio.read_frame()
-                
-                # Check for wake word
-                if wake_word.process_frame(frame):
-                    logger.info("Wake word detected!")
-                    print("\n[WAKE WORD DETECTED]")
-                    state = "WAKE_DETECTED"
-            
-            elif state == "WAKE_DETECTED":
-                # Show listening animation
-                if display: display.show_listening_face()
-                print("Listening...")
-                state = "LISTENING"
-            
-            elif state == "LISTENING":
-                # Record until silence or timeout
-                audio_buffer = audio.record_until_silence(
-                    max_duration=config["recording"]["max_duration"],
-                    silence_threshold=config["recording"]["silence_threshold"],
-                    silence_duration=config["recording"]["silence_duration"]
-                )
-                print("Recording complete.")
-                state = "PROCESSING"
-            
-            elif state == "PROCESSING":
-                # Show thinking animation
-                if display: display.show_thinking_face()
-                print("Processing speech...")
-                
-                # Transcribe
-                text = stt.transcribe(audio_buffer)
-                
-                if text:
-                    # Feed to LLM
-                    llm_data = llm.generate_response(text)
-                    response_text = llm_data["response"]
-                    mood = llm_data["mood"]
-                    
-                    # Show mood-based talking face
-                    if display: display.show_mood_face(mood)
-                    
-                    print(f"\n[AI RESPONSE]")
-                    print(f">>> {response_text}")
-                    print(f"[MOOD: {mood.upper()}]\n")
-                    
-                    # Speak response while mood animation plays
-                    spoken = False
-                    if 'tts' in locals() and tts and tts.available:
-                        spoken = tts.speak(response_text)
-                    if not spoken:
-                        time.sleep(config["display"].get("mood_duration", 10.0))
-                else:
-                    print("\n>>> (No speech detected)\n")
-                
-                # Return to idle
-                state = "IDLE"
-                if display: display.show_idle_face()
-                print("Ready for next command.")
-                
     except KeyboardInterrupt:
         print("\nShutting down...")
     except Exception as e:
         logger.error(f"Unexpected error in main loop: {e}")
     finally:
-        # Cleanup
-        logger.info("Cleaning up resources...")
-        if 'audio' in locals(): audio.cleanup()
-        if 'wake_word' in locals(): wake_word.cleanup()
-        if 'display' in locals() and display: 
-            display.clear()
-            display.cleanup()
-        if 'stt' in locals(): stt.cleanup()
-        if 'tts' in locals(): tts.cleanup()
+        cleanup_components(components)
         print("Goodbye!")
 
 if __name__ == "__main__":
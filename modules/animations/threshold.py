@@ -1,9 +1,15 @@
 from PIL import Image
 import os
+import sys
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from modules.frame_cache import THRESHOLD, threshold_gif
+
+# The display compiles frames straight from these GIFs (see modules/frame_cache.py);
+# this only writes the thresholded copies to clean/ for previewing.
 INPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(INPUT_DIR, "clean")
-THRESHOLD = 128  # pixels below this -> black, above -> white
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -11,22 +17,12 @@ for filename in sorted(os.listdir(INPUT_DIR)):
     if not filename.endswith(".gif"):
         continue
 
-    img = Image.open(os.path.join(INPUT_DIR, filename))
-    clean_frames = []
-    durations = []
-
-    frame_idx = 0
-    while True:
-        try:
-            img.seek(frame_idx)
-        except EOFError:
-            break
-
-        frame = img.convert("L")  # grayscale
-        frame = frame.point(lambda p: 255 if p >= THRESHOLD else 0, mode="1")
-        clean_frames.append(frame.convert("P"))
-        durations.append(img.info.get("duration", 42))
-        frame_idx += 1
+    in_path = os.path.join(INPUT_DIR, filename)
+    with Image.open(in_path) as img:
+        background = img.info.get("background", 0)
+    frames = threshold_gif(in_path, THRESHOLD)
+    clean_frames = [Image.fromarray(pixels).convert("P") for pixels, _ in frames]
+    durations = [duration for _, duration in frames]
 
     out_path = os.path.join(OUTPUT_DIR, filename)
     clean_frames[0].save(
@@ -34,6 +30,7 @@ for filename in sorted(os.listdir(INPUT_DIR)):
         save_all=True,
         append_images=clean_frames[1:],
         duration=durations,
+        background=background,
         loop=0,
     )
-    print(f"{filename}: {frame_idx} frames -> {out_path}")
+    print(f"{filename}: {len(frames)} frames -> {out_path}")
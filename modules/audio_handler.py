@@ -5,23 +5,37 @@ import time
 import math
 from collections import deque
 
+from modules.playback import PlaybackEngine
+from modules.ring_buffer import AudioRingBuffer
+
 class AudioHandler:
     """
     Manages audio input/output streams using PyAudio.
     Handles continuous recording and silence detection.
+
+    In "callback" capture mode PortAudio pushes audio into a preallocated
+    ring buffer on its own thread, so a slow consumer never causes input
+    overflows. Consumers read through cursors and get zero-copy views.
     """
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, vad=None):
         """
         Initialize PyAudio and configure audio parameters.
         
         Args:
             config: Audio configuration from config.yaml
+            vad: Optional VoiceActivityDetector used for endpointing instead
+                of the fixed RMS threshold
         """
         self.logger = logging.getLogger("AudioHandler")
         self.config = config
         self.pa = pyaudio.PyAudio()
         self.stream = None
+        self.vad = vad
+        # Per-frame VAD decisions/energy of the last recording, aligned with its samples
+        self.last_speech_flags = np.zeros(0, dtype=bool)
+        self.last_energy_db = np.zeros(0, dtype=np.float32)
+        self.last_pre_roll_frames = 0
         
         # Audio parameters
         self.sample_rate = config.get("sample_rate", 16000)
@@ -30,6 +44,29 @@ class AudioHandler:
         self.channels = config.get("channels", 1)
         self.input_device = config.get("input_device_index", 3)
         self.output_device = config.get("output_device_index", 3)
+
+        # Capture mode: "callback" (ring buffer) or "blocking" (stream.read)
+        self.capture_mode = config.get("capture_mode", "callback")
+        self.read_timeout = config.get("read_timeout", 2.0)
+        self.ring = None
+        self._cursor = None
+        self.overflows = 0
+        # Pre-roll: audio kept from before recording starts (see set_pre_roll)
+        self.pre_roll_seconds = 0.0
+        self._pre_roll = None
+        if self.capture_mode == "callback":
+            ring_seconds = config.get("ring_buffer_seconds", 30.0)
+            self.ring = AudioRingBuffer(int(ring_seconds * self.sample_rate))
+        
+        # Persistent output stream, opened on first use
+        self.playback = PlaybackEngine(
+            self.pa,
+            self.output_device,
+            sample_rate=config.get("output_sample_rate", 22050),
+            frames_per_buffer=config.get("output_buffer_size", 1024)
+        )
+        self.max_volume = config.get("max_volume", 2.0)
+        self.set_volume(config.get("volume", 1.0))
         
         # Validate device
         try:
@@ -48,34 +85,108 @@ class AudioHandler:
     def start_input_stream(self):
         """Start audio input stream from USB microphone"""
         try:
-            self.stream = self.pa.open(
-                rate=self.sample_rate,
-                channels=self.channels,
-                format=self.format,
-                input=True,
-                frames_per_buffer=self.chunk_size,
-                input_device_index=self.input_device
-            )
-            self.logger.info("Audio input stream started")
+            if self.ring is not None:
+                self.ring.reopen()
+                self._cursor = self.ring.cursor()
+                self.stream = self.pa.open(
+                    rate=self.sample_rate,
+                    channels=self.channels,
+                    format=self.format,
+                    input=True,
+                    frames_per_buffer=self.chunk_size,
+                    input_device_index=self.input_device,
+                    stream_callback=self._capture_callback
+                )
+            else:
+                self.stream = self.pa.open(
+                    rate=self.sample_rate,
+                    channels=self.channels,
+                    format=self.format,
+                    input=True,
+                    frames_per_buffer=self.chunk_size,
+                    input_device_index=self.input_device
+                )
+            self.logger.info(f"Audio input stream started ({self.capture_mode} mode)")
         except Exception as e:
             self.logger.error(f"Failed to start input stream: {e}")
             raise
 
-    def read_frame(self) -> bytes:
+    def start_output_stream(self):
+        """Open the persistent playback stream ahead of the first utterance"""
+        try:
+            self.playback.start()
+        except Exception as e:
+            self.logger.error(f"Failed to start output stream: {e}")
+
+    def _capture_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: copy the new block into the ring buffer"""
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        return (None, pyaudio.paContinue)
+
+    def create_cursor(self, position: int = None):
+        """
+        Create an independent reader on the capture ring buffer.
+
+        Args:
+            position: Absolute sample position to start from (default: live edge)
+        """
+        if self.ring is None:
+            raise RuntimeError("Cursors require capture_mode 'callback'")
+        return self.ring.cursor(position)
+
+    def flush_input(self):
+        """Skip any audio queued for read_frame and continue from the live edge"""
+        if self._cursor is not None:
+            self._cursor.seek(self.ring.write_position)
+
+    def set_pre_roll(self, seconds: float):
+        """
+        Keep a rolling window of recent audio to prepend to recordings.
+
+        In callback mode the ring buffer already holds the history, so this
+        only records the length. In blocking mode the last frames returned
+        by read_frame are kept in a bounded deque.
+
+        Args:
+            seconds: Pre-roll length (recording.pre_buffer_duration)
+        """
+        self.pre_roll_seconds = max(0.0, seconds)
+        if self.ring is None:
+            frames = int(math.ceil(self.pre_roll_seconds * self.sample_rate / self.chunk_size))
+            self._pre_roll = deque(maxlen=frames) if frames > 0 else None
+
+    def read_frame(self, cursor=None) -> np.ndarray:
         """
         Read one audio frame (512 samples).
         
+        Args:
+            cursor: Ring cursor to read from (default: the handler's own cursor)
+            
         Returns:
-            bytes: Raw audio data (1024 bytes for 512 int16 samples)
+            np.ndarray: int16 samples. In callback mode this is a view into
+            the ring buffer and stays valid until capture laps it.
         """
         if self.stream is None or not self.stream.is_active():
             raise RuntimeError("Stream is not active")
+
+        if self.ring is not None:
+            try:
+                return (cursor or self._cursor).read(self.chunk_size, timeout=self.read_timeout)
+            except TimeoutError:
+                raise RuntimeError("Stream is not delivering audio")
             
         try:
-            return self.stream.read(self.chunk_size, exception_on_overflow=False)
+            data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+            frame = np.frombuffer(data, dtype=np.int16)
         except IOError as e:
             self.logger.warning(f"Audio overflow: {e}")
-            return b'\x00' * (self.chunk_size * 2)
+            self.overflows += 1
+            frame = np.zeros(self.chunk_size, dtype=np.int16)
+        if self._pre_roll is not None:
+            self._pre_roll.append(frame)
+        return frame
 
     def calculate_rms(self, audio_data: bytes) -> float:
         """
@@ -96,31 +207,107 @@ class AudioHandler:
         except Exception:
             return 0.0
 
-    def record_until_silence(self, max_duration: float = 5.0, silence_threshold: int = 500, silence_duration: float = 1.5) -> bytes:
+    def record_until_silence(self, max_duration: float = 5.0, silence_threshold: int = 500, silence_duration: float = 1.5, on_frame=None, no_speech_timeout: float = None) -> np.ndarray:
         """
         Record audio until silence or max duration.
+
+        Recording continues from the last frame handed to the wake word
+        detector, so nothing said while the display switches state is lost,
+        and the configured pre-roll is spliced in front of it.
         
         Args:
             max_duration: Maximum recording time in seconds
             silence_threshold: RMS threshold for silence
             silence_duration: Seconds of silence before auto-stop
+            on_frame: Optional callable fed every captured block (pre-roll
+                included) while recording, e.g. a streaming recognizer
+            no_speech_timeout: With a VAD, give up after this many seconds
+                if no speech has started (None = wait up to max_duration)
+
+        When a VAD is attached, silence means "not speech" by its adaptive
+        decision rather than RMS below ``silence_threshold``, and the
+        per-frame decisions are kept in ``last_speech_flags`` (the first
+        ``last_pre_roll_frames`` of them cover the pre-roll).
             
         Returns:
-            bytes: Complete audio recording as WAV bytes
+            np.ndarray: Complete recording as int16 PCM samples. In callback
+            mode it is gathered as a single view of the ring buffer and
+            copied once at the end, since capture keeps overwriting the ring.
         """
         self.logger.info("Started recording...")
-        frames = []
         silent_frames = 0
         total_frames = 0
+        heard_speech = False
+        flags = []
+        energies = []
         
         max_frames = int(max_duration * self.sample_rate / self.chunk_size)
         silence_frame_limit = int(silence_duration * self.sample_rate / self.chunk_size)
+        pre_roll = int(self.pre_roll_seconds * self.sample_rate)
+        no_speech_limit = max_frames
+        if self.vad is not None and no_speech_timeout:
+            no_speech_limit = int(no_speech_timeout * self.sample_rate / self.chunk_size)
+
+        def track(block):
+            flags.append(self.vad.process(block))
+            energies.append(self.vad.last_energy_db)
+
+        if self.vad is not None:
+            self.vad.reset()
+
+        if self.ring is not None:
+            # Pre-roll is simply older audio in the ring: start the view earlier
+            start = max(self._cursor.position - pre_roll, self.ring.oldest_position)
+            # The whole utterance must fit in the ring to be read as one view
+            max_frames = min(max_frames, (self.ring.capacity - (self._cursor.position - start)) // self.chunk_size)
+            if self._cursor.position > start:
+                pre_audio = self.ring.view(start, self._cursor.position)
+                if on_frame:
+                    on_frame(pre_audio)
+                if self.vad is not None:
+                    track(pre_audio)
+        else:
+            # Preallocate once and write pre-roll and new frames straight into it
+            pre_frames = list(self._pre_roll) if self._pre_roll is not None else []
+            buffer = np.empty((len(pre_frames) + max_frames) * self.chunk_size, dtype=np.int16)
+            filled = 0
+            for frame in pre_frames:
+                buffer[filled:filled + len(frame)] = frame
+                filled += len(frame)
+            if on_frame and filled:
+                on_frame(buffer[:filled])
+            if self.vad is not None and filled:
+                track(buffer[:filled])
+
+        if self.vad is not None:
+            # The pre-roll holds the wake word; endpointing starts after it
+            self.vad.reset_state()
+            pre_roll_frames = sum(len(f) for f in flags)
         
         try:
             while total_frames < max_frames:
                 data = self.read_frame()
-                frames.append(data)
+                if self.ring is None:
+                    buffer[filled:filled + len(data)] = data
+                    filled += len(data)
                 total_frames += 1
+                if on_frame:
+                    on_frame(data)
+
+                if self.vad is not None:
+                    track(data)
+                    if self.vad.in_speech:
+                        heard_speech = True
+                        silent_frames = 0
+                    else:
+                        silent_frames += 1
+                    if not heard_speech and total_frames >= no_speech_limit:
+                        self.logger.info("No speech detected, stopping recording")
+                        break
+                    if heard_speech and silent_frames >= silence_frame_limit:
+                        self.logger.info("End of speech detected, stopping recording")
+                        break
+                    continue
                 
                 rms = self.calculate_rms(data)
                 
@@ -136,43 +323,132 @@ class AudioHandler:
         except Exception as e:
             self.logger.error(f"Error during recording: {e}")
             
-        self.logger.info(f"Recording finished. captured {len(frames)} frames")
-        return b''.join(frames)
-
-    def play_audio(self, audio_data, sample_rate: int, channels: int = 1):
-        """Play raw PCM audio through the configured output device."""
-        if audio_data is None:
-            return
+        self.logger.info(f"Recording finished. captured {total_frames} frames")
+        if self.vad is not None:
+            self.last_speech_flags = np.concatenate(flags) if flags else np.zeros(0, dtype=bool)
+            self.last_energy_db = np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+            self.last_pre_roll_frames = pre_roll_frames
+        if self.ring is not None:
+            end = self._cursor.position
+            # Copy out: the caller may hold on to it (STT queue, model load) while the ring laps
+            return np.array(self.ring.view(max(start, self.ring.oldest_position, end - self.ring.capacity), end))
+        if self._pre_roll is not None:
+            self._pre_roll.clear()
+        return buffer[:filled]
 
+    def _to_pcm16(self, audio_data, channels: int = 1) -> np.ndarray | None:
+        """Normalize playback input to mono int16 samples"""
         if isinstance(audio_data, np.ndarray):
             if audio_data.dtype != np.int16:
                 audio_data = np.clip(audio_data, -1.0, 1.0)
                 audio_data = (audio_data * 32767).astype(np.int16)
-            audio_bytes = audio_data.tobytes()
-        elif isinstance(audio_data, bytes):
-            audio_bytes = audio_data
+            samples = audio_data
+        elif isinstance(audio_data, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(audio_data, dtype=np.int16)
         else:
             self.logger.error("Unsupported audio data type for playback")
-            return
+            return None
+
+        if channels > 1:
+            # The playback stream is mono; downmix interleaved frames
+            samples = samples[:len(samples) - len(samples) % channels]
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return samples
+
+    def enqueue_audio(self, audio_data, sample_rate: int, channels: int = 1) -> int | None:
+        """
+        Queue audio on the persistent playback stream and return immediately.
+
+        Args:
+            audio_data: int16/float NumPy array or raw int16 bytes
+            sample_rate: Rate of the data; converted to the stream rate
+            channels: Interleaved channels in the data
 
+        Returns:
+            int: Mark to pass to wait_playback(), or None on error
+        """
+        if audio_data is None:
+            return None
+        samples = self._to_pcm16(audio_data, channels)
+        if samples is None:
+            return None
         try:
-            stream = self.pa.open(
-                format=pyaudio.paInt16,
-                channels=channels,
-                rate=sample_rate,
-                output=True,
-                output_device_index=self.output_device
-            )
-            stream.write(audio_bytes)
-            stream.stop_stream()
-            stream.close()
+            return self.playback.enqueue(samples, sample_rate)
         except Exception as e:
             self.logger.error(f"Failed to play audio: {e}")
+            return None
+
+    def flush_playback(self):
+        """Stop playback and drop everything queued"""
+        self.playback.flush()
+
+    def wait_playback(self, mark: int = None, timeout: float = None) -> bool:
+        """Block until queued audio (up to ``mark``) has played"""
+        return self.playback.wait(mark, timeout)
+
+    @property
+    def volume(self) -> float:
+        return self.playback.gain
+
+    def set_volume(self, volume: float) -> float:
+        """
+        Set the playback gain (1.0 = unchanged), clamped to [0, max_volume].
+
+        Returns:
+            float: The gain actually applied
+        """
+        self.playback.gain = min(max(volume, 0.0), self.max_volume)
+        return self.playback.gain
+
+    def playback_progress(self) -> dict:
+        """Samples played so far and samples still queued on the output stream"""
+        return {
+            "samples_played": self.playback.samples_played,
+            "pending_samples": self.playback.pending_samples,
+            "sample_rate": self.playback.sample_rate,
+        }
+
+    def play_audio(self, audio_data, sample_rate: int, channels: int = 1):
+        """Play raw PCM audio through the configured output device."""
+        mark = self.enqueue_audio(audio_data, sample_rate, channels)
+        if mark is not None:
+            self.wait_playback(mark)
     
+    def play_stream(self, chunks, sample_rate: int, channels: int = 1) -> int:
+        """
+        Play a sequence of PCM chunks back to back.
+
+        Each chunk is queued on the persistent output stream as soon as it
+        is produced, so consecutive chunks (e.g. TTS sentences still being
+        synthesized) play without gaps.
+
+        Args:
+            chunks: Iterable of NumPy arrays; may block while producing
+            sample_rate: Sample rate of every chunk
+
+        Returns:
+            int: Number of chunks played
+        """
+        played = 0
+        mark = None
+        for samples in chunks:
+            if samples is None or len(samples) == 0:
+                continue
+            chunk_mark = self.enqueue_audio(samples, sample_rate, channels)
+            if chunk_mark is not None:
+                mark = chunk_mark
+                played += 1
+        if mark is not None:
+            self.wait_playback(mark)
+        return played
+
     def cleanup(self):
         """Terminate PyAudio"""
+        if self.ring is not None:
+            self.ring.close()
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
+        self.playback.close()
         self.pa.terminate()
         self.logger.info("Audio resources released")
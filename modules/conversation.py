@@ -0,0 +1,157 @@
+import logging
+import re
+import threading
+
+# Word pieces and punctuation, roughly how BPE tokenizers split English text
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+# Chat formatting overhead per message (role markers, separators)
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local estimate of the token count of ``text``.
+
+    Counts word pieces and punctuation, charging long words extra. Close
+    enough to Llama-style tokenizers on English chat text for budgeting,
+    without loading a tokenizer.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        tokens += 1 + len(piece) // 8
+    return tokens
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+
+
+class ConversationMemory:
+    """
+    Chat history kept within a token budget.
+
+    Recent messages are sent verbatim as long as they fit in
+    ``token_budget``; anything older is folded into a short rolling summary
+    that is sent instead. Summarizing calls the LLM, so it is not done
+    while building a prompt: compact() is meant to run in the background
+    after the reply has been spoken. Until it has run, messages that no
+    longer fit are simply left out, so the prompt size stays bounded either
+    way.
+    """
+
+    def __init__(self, config: dict, summarize=None):
+        """
+        Args:
+            config: LLM configuration from config.yaml
+            summarize: Callable (previous summary, messages) -> new summary
+                text, or None to drop old messages instead
+        """
+        self.logger = logging.getLogger("Conversation")
+        self.token_budget = config.get("history_token_budget", 400)
+        self.max_messages = config.get("max_history", 5) * 2
+        self.summarize = summarize if config.get("summarize_history", True) else None
+        self.messages = []
+        self.summary = ""
+        self._lock = threading.Lock()
+        self._compacting = None
+        # Messages ever removed from the front, so compact() can tell what add() trimmed meanwhile
+        self._dropped = 0
+        self._generation = 0
+
+    def add(self, user_text: str, assistant_text: str):
+        with self._lock:
+            self.messages.append({"role": "user", "content": user_text})
+            self.messages.append({"role": "assistant", "content": assistant_text})
+            # Hard cap in case summarizing keeps failing
+            if len(self.messages) > 4 * self.max_messages:
+                del self.messages[:2]
+                self._dropped += 2
+
+    def _split(self) -> int:
+        """Index of the first message that still fits the budget (caller holds the lock)"""
+        used = 0
+        start = len(self.messages)
+        # Walk back one exchange (user + assistant) at a time
+        while start >= 2 and len(self.messages) - start < self.max_messages:
+            cost = message_tokens(self.messages[start - 1]) + message_tokens(self.messages[start - 2])
+            if used + cost > self.token_budget:
+                break
+            used += cost
+            start -= 2
+        return start
+
+    def build_messages(self, system_prompt: str, text: str) -> list:
+        """
+        Messages for the next request: system prompt, summary, the recent
+        history that fits the budget, then the new user message.
+        """
+        with self._lock:
+            recent = self.messages[self._split():]
+            summary = self.summary
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the conversation so far: {summary}"})
+        messages.extend(recent)
+        messages.append({"role": "user", "content": text})
+        return messages
+
+    def prompt_tokens(self, messages: list) -> int:
+        return sum(message_tokens(m) for m in messages)
+
+    def overflow(self) -> int:
+        """Number of messages waiting to be folded into the summary"""
+        with self._lock:
+            return self._split()
+
+    def compact(self):
+        """Fold messages that no longer fit into the summary (blocking; calls the LLM)"""
+        with self._lock:
+            count = self._split()
+            old = self.messages[:count]
+            summary = self.summary
+            dropped = self._dropped
+            generation = self._generation
+        if not old:
+            return
+
+        if self.summarize is None:
+            new_summary = summary
+        else:
+            try:
+                new_summary = self.summarize(summary, old)
+            except Exception as e:
+                self.logger.warning(f"Summarizing history failed: {e}")
+                return
+            if not new_summary:
+                return
+
+        with self._lock:
+            if self._generation != generation:
+                return  # History was cleared while summarizing
+            # add() may have trimmed some of the summarized messages meanwhile; the rest are still at the front
+            remaining = max(0, count - (self._dropped - dropped))
+            del self.messages[:remaining]
+            self._dropped += remaining
+            self.summary = new_summary
+        self.logger.info(
+            f"Folded {count} messages into summary ({estimate_tokens(new_summary)} tokens); "
+            f"{len(self.messages)} kept"
+        )
+
+    def compact_async(self):
+        """Run compact() in a background thread if anything needs folding"""
+        if self._compacting is not None and self._compacting.is_alive():
+            return
+        if not self.overflow():
+            return
+        self._compacting = threading.Thread(target=self.compact, name="history-summary", daemon=True)
+        self._compacting.start()
+
+    def clear(self):
+        with self._lock:
+            self.messages = []
+            self.summary = ""
+            self._generation += 1
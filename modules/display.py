@@ -1,16 +1,21 @@
 from luma.core.interface.serial import i2c
 from luma.core.render import canvas
 from luma.oled.device import ssd1306
-from PIL import Image, ImageDraw, ImageFont, ImageSequence
+from PIL import ImageDraw, ImageFont
 import logging
 import time
 import os
 import threading
 
+from modules.frame_cache import FrameCache, unpack_frame
+from modules.frame_scheduler import AnimationStats, FrameScheduler
+from modules.oled_output import PartialUpdateWriter
+
 class DisplayController:
     """
     Controls the OLED display to show animated faces and text.
-    Uses GIF files from modules/animations/
+    Uses GIF files from modules/animations/, precompiled once into a
+    memory-mapped cache of packed 1-bit framebuffers (see FrameCache).
     """
     
     def __init__(self, config: dict):
@@ -19,13 +24,16 @@ class DisplayController:
         """
         self.logger = logging.getLogger("Display")
         self.config = config
-        self.animation_dir = os.path.join(os.path.dirname(__file__), "animations", "clean")
+        self.animation_dir = os.path.join(os.path.dirname(__file__), "animations")
         
         # Animation thread control
         self.current_animation = None
         self.stop_event = threading.Event()
         self.animation_thread = None
         self.lock = threading.Lock()
+        self.output = None
+        self.scheduler = FrameScheduler(late_threshold=config.get("late_frame_threshold", 0.005))
+        self.animation_stats = {}
         
         try:
             # I2C configuration
@@ -35,6 +43,12 @@ class DisplayController:
             serial = i2c(port=port, address=address)
             self.device = ssd1306(serial, width=config.get("width", 128), height=config.get("height", 64))
             self.device.contrast(config.get("contrast", 255))
+
+            # Send only changed regions of each frame (needs raw command/data access)
+            if config.get("partial_updates", True) and all(
+                hasattr(self.device, attr) for attr in ("command", "data", "_const")
+            ):
+                self.output = PartialUpdateWriter(self.device, self.device.width, self.device.height)
             
             self.logger.info(f"OLED display initialized at {port}:{hex(address)}")
             self.clear()
@@ -43,48 +57,63 @@ class DisplayController:
             self.logger.error(f"Failed to initialize display: {e}")
             self.device = None
 
-    def _animation_loop(self, gif_path):
-        """Background thread to play GIF animation"""
+        # Decode every animation once up front instead of on each play_animation
+        self.frame_cache = None
+        if self.device:
+            try:
+                cache_path = config.get("frame_cache") or os.path.join(
+                    self.animation_dir, ".cache",
+                    f"frames_{self.device.width}x{self.device.height}.bin"
+                )
+                self.frame_cache = FrameCache(
+                    self.animation_dir,
+                    cache_path,
+                    width=self.device.width,
+                    height=self.device.height,
+                    lru_size=config.get("frame_cache_lru", 4),
+                    jobs=config.get("frame_cache_jobs", 0)
+                )
+                self.frame_cache.load()
+            except Exception as e:
+                self.logger.error(f"Failed to build animation frame cache: {e}")
+                self.frame_cache = None
+
+    def _write_frame(self, buf):
+        """Send one packed framebuffer to the controller"""
+        if self.output is not None:
+            self.output.write(buf)
+        else:
+            self.device.display(unpack_frame(buf, self.device.width, self.device.height))
+
+    def get_stats(self) -> dict:
+        """I2C traffic of the frame output and per-animation FPS/jitter metrics"""
+        return {
+            "output": self.output.get_stats() if self.output is not None else {},
+            "animations": {name: stats.to_dict() for name, stats in self.animation_stats.items()},
+        }
+
+    def _show_frame(self, frame_buf):
+        with self.lock:
+            if self.device:
+                self._write_frame(frame_buf)
+
+    def _animation_loop(self, name):
+        """Background thread to play a precompiled animation"""
         try:
-            with Image.open(gif_path) as img:
-                # Pre-process frames for the display size
-                frames = []
-                for frame in ImageSequence.Iterator(img):
-                    # Convert to grayscale, resize/crop to fit display, convert to 1-bit
-                    # We preserve aspect ratio and center it
-                    f = frame.convert("RGBA").convert("L")
-                    # Scale to fit height
-                    scale = self.device.height / f.height
-                    new_size = (int(f.width * scale), self.device.height)
-                    f = f.resize(new_size, Image.Resampling.LANCZOS)
-                    
-                    # Create blank black image and center the frame
-                    canvas_img = Image.new("1", (self.device.width, self.device.height))
-                    left = (self.device.width - f.width) // 2
-                    canvas_img.paste(f.convert("1"), (left, 0))
-                    
-                    duration = frame.info.get('duration', 100) / 1000.0
-                    frames.append((canvas_img, duration))
-
-                while not self.stop_event.is_set():
-                    for frame_img, duration in frames:
-                        if self.stop_event.is_set():
-                            break
-                        with self.lock:
-                            if self.device:
-                                self.device.display(frame_img)
-                        time.sleep(duration)
+            animation = self.frame_cache.get(name)
+            stats = self.animation_stats.setdefault(name, AnimationStats(name))
+            self.scheduler.run(animation.frames, animation.durations, self._show_frame, self.stop_event, stats)
         except Exception as e:
             self.logger.error(f"Animation loop error: {e}")
 
     def play_animation(self, name: str):
         """Start playing a specific GIF animation from the animations folder"""
-        if not self.device:
+        if not self.device or self.frame_cache is None:
             self.logger.warning(f"Display not available, skipping animation: {name}")
             return
 
-        gif_path = os.path.join(self.animation_dir, f"{name}.gif")
-        if not os.path.exists(gif_path):
+        if self.frame_cache is None or not self.frame_cache.has(name):
+            gif_path = os.path.join(self.animation_dir, f"{name}.gif")
             self.logger.error(f"Animation file not found: {gif_path}")
             # Fallback to neutral if mood-based one missing
             if name not in ["idle", "listening", "thinking"]:
@@ -99,7 +128,7 @@ class DisplayController:
         
         self.current_animation = name
         self.stop_event.clear()
-        self.animation_thread = threading.Thread(target=self._animation_loop, args=(gif_path,), daemon=True)
+        self.animation_thread = threading.Thread(target=self._animation_loop, args=(name,), daemon=True)
         self.animation_thread.start()
 
     def stop_animation(self):
@@ -135,6 +164,9 @@ class DisplayController:
         self.stop_animation()
         
         try:
+            # luma redraws the whole screen; the diff baseline is no longer valid
+            if self.output is not None:
+                self.output.invalidate()
             with canvas(self.device) as draw:
                 font = ImageFont.load_default()
                 # Simple multi-line wrap for 128x64
@@ -164,6 +196,8 @@ class DisplayController:
         self.stop_animation()
         if self.device:
             self.device.clear()
+        if self.output is not None:
+            self.output.invalidate()
 
     def cleanup(self):
         self.clear()
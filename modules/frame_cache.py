@@ -0,0 +1,358 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+MAGIC = b"COGFRM01"
+FORMAT_VERSION = 3
+
+
+THRESHOLD = 128  # grayscale level at or above which a source pixel is lit
+
+
+def threshold_gif(gif_path: str, threshold: int = THRESHOLD) -> list:
+    """
+    Decode a source GIF into clean black/white frames.
+
+    Each frame is converted to grayscale and cut at ``threshold`` in one
+    array comparison, which is what animations/threshold.py used to do
+    pixel by pixel before the cleaned GIFs were compiled.
+
+    Returns:
+        list: (boolean (height, width) array, duration in ms) per frame
+    """
+    frames = []
+    with Image.open(gif_path) as img:
+        for frame in ImageSequence.Iterator(img):
+            gray = np.asarray(frame.convert("L"))
+            frames.append((gray >= threshold, img.info.get("duration", 42)))
+    return frames
+
+
+def render_frame(pixels: np.ndarray, width: int, height: int):
+    """
+    Scale a thresholded frame to the display height, center it and convert
+    it to 1-bit exactly as the display used to do at runtime.
+
+    Returns:
+        PIL "1" image of the display size
+    """
+    f = Image.fromarray(pixels.astype(np.uint8) * 255)
+    # Scale to fit height
+    scale = height / f.height
+    new_size = (int(f.width * scale), height)
+    f = f.resize(new_size, Image.Resampling.LANCZOS)
+
+    # Create blank black image and center the frame
+    canvas_img = Image.new("1", (width, height))
+    left = (width - f.width) // 2
+    canvas_img.paste(f.convert("1"), (left, 0))
+    return canvas_img
+
+
+def compile_gif(gif_path: str, width: int, height: int) -> tuple:
+    """
+    Threshold a source GIF (see threshold_gif), render each frame (see
+    render_frame) and pack it for the display.
+
+    Returns:
+        tuple: (list of packed frame bytes, list of durations in seconds)
+    """
+    frames = threshold_gif(gif_path)
+    return ([pack_frame(render_frame(pixels, width, height), width, height).tobytes() for pixels, _ in frames],
+            [duration / 1000.0 for _, duration in frames])
+
+
+def _compile_job(args: tuple) -> tuple:
+    name, gif_path, width, height = args
+    return name, compile_gif(gif_path, width, height)
+
+
+def pack_bits(pixels: np.ndarray) -> np.ndarray:
+    """
+    Pack a (height, width) boolean array into SSD1306 page layout.
+
+    Each byte holds 8 vertical pixels (LSB on top); bytes run left to right
+    within a page and pages top to bottom, matching horizontal addressing.
+    """
+    height, width = pixels.shape
+    pages = pixels.reshape(height // 8, 8, width)
+    weights = (1 << np.arange(8, dtype=np.uint8))[np.newaxis, :, np.newaxis]
+    return (pages * weights).sum(axis=1, dtype=np.uint8).ravel()
+
+
+def pack_frame(image, width: int, height: int) -> np.ndarray:
+    """Pack a 1-bit PIL image into SSD1306 page layout (see pack_bits)"""
+    return pack_bits(np.asarray(image.convert("1"), dtype=bool).reshape(height, width))
+
+
+def unpack_frame(buf: np.ndarray, width: int, height: int):
+    """Inverse of pack_frame, for devices that only accept PIL images"""
+    pages = np.frombuffer(buf, dtype=np.uint8).reshape(height // 8, 1, width)
+    bits = (pages >> np.arange(8, dtype=np.uint8)[np.newaxis, :, np.newaxis]) & 1
+    return Image.fromarray((bits.reshape(height, width) * 255).astype(np.uint8)).convert("1")
+
+
+class Animation:
+    """Packed frames of one animation plus their durations"""
+
+    def __init__(self, name: str, frames: list, durations: list):
+        self.name = name
+        self.frames = frames
+        self.durations = durations
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class FrameCache:
+    """
+    Memory-mapped bundle of precompiled animation framebuffers.
+
+    All source GIFs in ``source_dir`` are thresholded and compiled once into packed 1-bit
+    display-native frames and stored in a single bundle file, together with
+    each source's mtime and size. Identical frames (idle loops repeat a
+    lot) are stored once and shared. On load the file is memory-mapped, and
+    only animations whose source changed are compiled again, in parallel
+    across cores. Recently used animations are kept in an in-memory LRU so
+    switching is instant.
+    """
+
+    def __init__(self, source_dir: str, cache_path: str, width: int = 128, height: int = 64,
+                 lru_size: int = 4, jobs: int = 0):
+        """
+        Args:
+            source_dir: Folder with the source GIFs
+            cache_path: Bundle file to read/write
+            width: Display width in pixels
+            height: Display height in pixels
+            lru_size: Animations kept unpacked in memory
+            jobs: Threads used for compiling (0 = one per core)
+        """
+        self.logger = logging.getLogger("FrameCache")
+        self.source_dir = source_dir
+        self.cache_path = cache_path
+        self.width = width
+        self.height = height
+        self.frame_bytes = width * height // 8
+        self.lru_size = lru_size
+        self.jobs = jobs or os.cpu_count() or 1
+
+        self._index = {}
+        self._data = None
+        self._data_offset = 0
+        self._lru = OrderedDict()
+
+    def _sources(self) -> dict:
+        sources = {}
+        for filename in sorted(os.listdir(self.source_dir)):
+            if filename.endswith(".gif"):
+                stat = os.stat(os.path.join(self.source_dir, filename))
+                sources[filename[:-4]] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        return sources
+
+    def _read(self):
+        """Map the cache file; returns its header or None if missing/invalid"""
+        try:
+            with open(self.cache_path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            if data[:len(MAGIC)] != MAGIC:
+                return None
+            (header_len,) = struct.unpack_from("<I", data, len(MAGIC))
+            header_start = len(MAGIC) + 4
+            header = json.loads(bytes(data[header_start:header_start + header_len]))
+            if (header.get("version") != FORMAT_VERSION or header.get("width") != self.width
+                    or header.get("height") != self.height):
+                return None
+        except (struct.error, ValueError):
+            return None
+
+        header["_data"] = data
+        header["_offset"] = _align(header_start + header_len)
+        return header
+
+    def load(self, force: bool = False):
+        """
+        Map the bundle, recompiling any animation whose source GIF changed.
+
+        Args:
+            force: Recompile every animation
+        """
+        sources = self._sources()
+        header = None if force else self._read()
+        old_index = header["animations"] if header else {}
+
+        stale = [name for name, meta in sources.items()
+                 if name not in old_index
+                 or old_index[name]["mtime_ns"] != meta["mtime_ns"]
+                 or old_index[name]["size"] != meta["size"]]
+        removed = [name for name in old_index if name not in sources]
+
+        if header and not stale and not removed:
+            self._use(header)
+            self.logger.info(f"Loaded {len(self._index)} animations from {self.cache_path}")
+            return
+
+        self.logger.info(f"Compiling {len(stale)} animation(s)")
+        start = time.monotonic()
+        compiled = self._compile(stale)
+
+        # Build the deduplicated frame table; unchanged animations are copied from the old bundle
+        frames = []
+        slots = {}
+        index = {}
+        total = 0
+        for name, meta in sources.items():
+            if name in compiled:
+                packed, durations = compiled[name]
+            else:
+                entry = old_index[name]
+                packed = [self._frame_bytes_from(header, i) for i in entry["frames"]]
+                durations = entry["durations"]
+            frame_slots = []
+            for data in packed:
+                if data not in slots:
+                    slots[data] = len(frames)
+                    frames.append(data)
+                frame_slots.append(slots[data])
+            total += len(packed)
+            index[name] = dict(meta, frames=frame_slots, durations=durations)
+
+        self.logger.info(
+            f"Compiled in {time.monotonic() - start:.2f}s: {total} frames, "
+            f"{len(frames)} unique ({self.frame_bytes * len(frames) / 1024:.0f} KB)"
+        )
+        self._write(index, frames)
+
+    def _compile(self, names: list) -> dict:
+        """
+        Compile GIFs in parallel; returns {name: (packed frames, durations)}.
+
+        Threads rather than processes: Pillow and NumPy release the GIL while
+        decoding, thresholding and resizing, and worker processes would re-import the application
+        (and repeat its logging setup) on every build.
+        """
+        jobs = [(name, os.path.join(self.source_dir, f"{name}.gif"), self.width, self.height) for name in names]
+        workers = min(self.jobs, len(jobs))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-compile") as pool:
+                return dict(pool.map(_compile_job, jobs))
+        return dict(_compile_job(job) for job in jobs)
+
+    def _frame_bytes_from(self, header: dict, slot: int) -> bytes:
+        start = header["_offset"] + slot * self.frame_bytes
+        return bytes(header["_data"][start:start + self.frame_bytes])
+
+    def _write(self, index: dict, frames: list):
+        header = {
+            "version": FORMAT_VERSION,
+            "width": self.width,
+            "height": self.height,
+            "frame_count": len(frames),
+            "animations": index,
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        prefix = MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes
+        padding = b"\0" * (_align(len(prefix)) - len(prefix))
+        blob = prefix + padding + b"".join(frames)
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, self.cache_path)
+            mapped = self._read()
+        except OSError as e:
+            self.logger.warning(f"Could not write frame cache ({e}); keeping it in memory")
+            mapped = None
+
+        if mapped is None:
+            header["_data"] = blob
+            header["_offset"] = len(prefix) + len(padding)
+            mapped = header
+        self._use(mapped)
+        self.logger.info(f"Frame cache ready: {len(index)} animations, {len(frames)} frames")
+
+    def _use(self, header: dict):
+        # Old mapping is dropped, not closed: frames still being shown keep it alive
+        self._data = header["_data"]
+        self._data_offset = header["_offset"]
+        self._index = header["animations"]
+        self._lru.clear()
+
+    def has(self, name: str) -> bool:
+        return name in self._index
+
+    def names(self) -> list:
+        return list(self._index)
+
+    def get(self, name: str) -> Animation | None:
+        """Return the packed frames for ``name`` (LRU-cached), or None"""
+        animation = self._lru.get(name)
+        if animation is not None:
+            self._lru.move_to_end(name)
+            return animation
+
+        entry = self._index.get(name)
+        if entry is None:
+            return None
+        # Repeated slots share one array
+        unpacked = {
+            slot: np.array(np.frombuffer(self._data, dtype=np.uint8, count=self.frame_bytes,
+                                         offset=self._data_offset + slot * self.frame_bytes))
+            for slot in set(entry["frames"])
+        }
+        frames = [unpacked[slot] for slot in entry["frames"]]
+        animation = Animation(name, frames, list(entry["durations"]))
+        self._lru[name] = animation
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+        return animation
+
+
+def _align(n: int, alignment: int = 16) -> int:
+    return (n + alignment - 1) // alignment * alignment
+
+
+def main():
+    """Offline asset compile step: python -m modules.frame_cache"""
+    animation_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "animations")
+    parser = argparse.ArgumentParser(description="Compile animation GIFs into a display frame bundle")
+    parser.add_argument("--source", default=animation_dir, help="Folder with the source GIFs")
+    parser.add_argument("--output", help="Bundle path (default: animations/.cache/frames_WxH.bin)")
+    parser.add_argument("--width", type=int, default=128)
+    parser.add_argument("--height", type=int, default=64)
+    parser.add_argument("--jobs", type=int, default=0, help="Compile threads (0 = one per core)")
+    parser.add_argument("--force", action="store_true", help="Recompile everything")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+    cache = FrameCache(
+        args.source,
+        args.output or os.path.join(animation_dir, ".cache", f"frames_{args.width}x{args.height}.bin"),
+        width=args.width,
+        height=args.height,
+        jobs=args.jobs
+    )
+    cache.load(force=args.force)
+    for name in cache.names():
+        animation = cache.get(name)
+        unique = len({id(frame) for frame in animation.frames})
+        print(f"{name}: {len(animation)} frames, {unique} unique")
+
+
+if __name__ == "__main__":
+    main()
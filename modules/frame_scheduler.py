@@ -0,0 +1,135 @@
+import threading
+import time
+
+
+class AnimationStats:
+    """Per-animation playback metrics: achieved FPS, late/dropped frames, jitter"""
+
+    # Upper bounds (ms) of the jitter histogram buckets; the last bucket is open-ended
+    JITTER_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100)
+
+    def __init__(self, name: str):
+        self.name = name
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self.late_frames = 0
+        self.active_time = 0.0
+        self.max_jitter_ms = 0.0
+        self.jitter_histogram = [0] * (len(self.JITTER_BUCKETS_MS) + 1)
+        self._running_since = None
+        self._lock = threading.Lock()
+
+    def record_frame(self, lateness: float, late_threshold: float):
+        jitter_ms = max(0.0, lateness) * 1000.0
+        bucket = len(self.JITTER_BUCKETS_MS)
+        for i, bound in enumerate(self.JITTER_BUCKETS_MS):
+            if jitter_ms <= bound:
+                bucket = i
+                break
+        with self._lock:
+            self.frames_shown += 1
+            self.jitter_histogram[bucket] += 1
+            self.max_jitter_ms = max(self.max_jitter_ms, jitter_ms)
+            if lateness > late_threshold:
+                self.late_frames += 1
+
+    def record_drops(self, count: int):
+        with self._lock:
+            self.frames_dropped += count
+
+    def begin(self):
+        with self._lock:
+            self._running_since = time.monotonic()
+
+    def end(self):
+        with self._lock:
+            if self._running_since is not None:
+                self.active_time += time.monotonic() - self._running_since
+                self._running_since = None
+
+    @property
+    def achieved_fps(self) -> float:
+        active = self.active_time
+        if self._running_since is not None:
+            active += time.monotonic() - self._running_since
+        return self.frames_shown / active if active > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            labels = [f"<={b}ms" for b in self.JITTER_BUCKETS_MS] + [f">{self.JITTER_BUCKETS_MS[-1]}ms"]
+            return {
+                "achieved_fps": self.achieved_fps,
+                "frames_shown": self.frames_shown,
+                "frames_dropped": self.frames_dropped,
+                "late_frames": self.late_frames,
+                "max_jitter_ms": self.max_jitter_ms,
+                "jitter_histogram": dict(zip(labels, self.jitter_histogram)),
+            }
+
+
+class FrameScheduler:
+    """
+    Plays frames against a monotonic deadline instead of sleeping per frame.
+
+    Each frame's slot starts where the previous one ended, so time spent
+    rendering and pushing over I2C is absorbed rather than added to every
+    frame. When the loop falls behind (CPU busy with Whisper or TTS) frames
+    whose slot has already passed are skipped, keeping the animation at
+    its authored speed.
+    """
+
+    def __init__(self, late_threshold: float = 0.005, min_frame_duration: float = 0.02):
+        """
+        Args:
+            late_threshold: Lateness (s) above which a shown frame counts as late
+            min_frame_duration: Floor for GIF frames with a 0 ms duration
+        """
+        self.late_threshold = late_threshold
+        self.min_frame_duration = min_frame_duration
+
+    def run(self, frames: list, durations: list, show, stop_event: threading.Event, stats: AnimationStats):
+        """
+        Loop over ``frames`` until ``stop_event`` is set.
+
+        Args:
+            frames: Frame payloads passed to ``show``
+            durations: Seconds each frame stays on screen
+            show: Callable that puts one frame on the display
+            stop_event: Ends playback when set (also interrupts the wait)
+            stats: Metrics sink for this animation
+        """
+        if not frames:
+            return
+        durations = [max(d, self.min_frame_duration) for d in durations]
+        cycle = sum(durations)
+
+        stats.begin()
+        deadline = time.monotonic()
+        index = 0
+        try:
+            while not stop_event.is_set():
+                now = time.monotonic()
+
+                # Far behind: skip whole loops at once
+                if now - deadline > cycle:
+                    loops = int((now - deadline) // cycle)
+                    deadline += loops * cycle
+                    stats.record_drops(loops * len(frames))
+
+                # Skip frames whose slot is already over
+                dropped = 0
+                while now >= deadline + durations[index]:
+                    deadline += durations[index]
+                    index = (index + 1) % len(frames)
+                    dropped += 1
+                if dropped:
+                    stats.record_drops(dropped)
+
+                show(frames[index])
+                stats.record_frame(now - deadline, self.late_threshold)
+
+                deadline += durations[index]
+                index = (index + 1) % len(frames)
+                stop_event.wait(max(0.0, deadline - time.monotonic()))
+        finally:
+            stats.end()
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Seconds spent opening connections (DNS + TCP + TLS) by the current thread's request
+_connect_time = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _connect_time.value = getattr(_connect_time, "value", 0.0) + time.monotonic() - start
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _connect_time.value = getattr(_connect_time, "value", 0.0) + time.monotonic() - start
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record how long they took to open"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class HTTPTransport:
+    """
+    Keep-alive HTTP client for the LLM API.
+
+    One requests.Session is reused for every turn, so DNS, TCP and TLS setup
+    is paid once instead of per request. Every request has explicit
+    connect/read timeouts, so a hung socket turns into an error instead of
+    freezing the assistant. prewarm() opens the connection in the
+    background (e.g. when the wake word fires) so the handshake overlaps
+    with recording. Connect time, time to first byte and total time are
+    logged for every request, attached to its response as ``timing`` and
+    kept in ``last_timing`` for the calling thread (the summarizer and
+    concurrent batch requests share the transport).
+    """
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: LLM configuration from config.yaml
+        """
+        self.logger = logging.getLogger("HTTPTransport")
+        self.base_url = config.get("base_url", "https://api.groq.com/openai/v1").rstrip("/")
+        self.timeout = (config.get("connect_timeout", 3.0), config.get("read_timeout", 20.0))
+        self.prewarm_path = config.get("prewarm_path", "/models")
+        self._local = threading.local()
+
+        self.session = requests.Session()
+        adapter = _TimedAdapter(pool_connections=1, pool_maxsize=config.get("pool_size", 2), max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._prewarm_thread = None
+
+    @property
+    def last_timing(self) -> dict:
+        """Timing of the last request made from the calling thread"""
+        return getattr(self._local, "timing", {})
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def post(self, path: str, headers: dict = None, json: dict = None, stream: bool = False) -> requests.Response:
+        """
+        POST to ``base_url + path``.
+
+        Without ``stream`` the body is read before returning and the timing
+        is complete. With ``stream`` only headers have arrived; iterate the
+        body with iter_lines() to get the total time logged.
+
+        Raises:
+            requests.RequestException: On connection errors and timeouts
+        """
+        _connect_time.value = 0.0
+        start = time.monotonic()
+        response = self.session.post(self.url(path), headers=headers, json=json,
+                                     timeout=self.timeout, stream=stream)
+        response.timing = self._local.timing = {
+            "started": start,
+            "connect": _connect_time.value,
+            "reused": _connect_time.value == 0.0,
+            "ttfb": time.monotonic() - start,
+            "status": response.status_code,
+        }
+        response._transport_start = start
+        if not stream:
+            response.content  # read the body so "total" covers it
+            self._finish(response)
+        return response
+
+    def iter_lines(self, response: requests.Response):
+        """Yield decoded lines of a streamed response, then log its timing"""
+        try:
+            first = True
+            # Event streams are always UTF-8; requests would fall back to ISO-8859-1 without a charset
+            for raw in response.iter_lines():
+                line = raw.decode("utf-8", errors="replace")
+                if first and line:
+                    response.timing["first_line"] = time.monotonic() - response._transport_start
+                    first = False
+                yield line
+        finally:
+            self._finish(response)
+            response.close()
+
+    def _finish(self, response: requests.Response):
+        timing = response.timing
+        timing["total"] = time.monotonic() - response._transport_start
+        self.logger.info(
+            f"HTTP {timing['status']}: connect {timing['connect'] * 1000:.0f}ms"
+            f"{' (reused)' if timing['reused'] else ''}, "
+            f"first byte {timing['ttfb'] * 1000:.0f}ms, total {timing['total'] * 1000:.0f}ms"
+        )
+
+    def prewarm(self, headers: dict = None):
+        """
+        Open a connection to the API in the background.
+
+        Sends a small HEAD request so DNS, TCP and TLS are done by the time
+        the real request goes out. Does nothing if a prewarm is in flight.
+        """
+        if self._prewarm_thread is not None and self._prewarm_thread.is_alive():
+            return
+        self._prewarm_thread = threading.Thread(target=self._prewarm, args=(headers,), daemon=True)
+        self._prewarm_thread.start()
+
+    def _prewarm(self, headers: dict):
+        _connect_time.value = 0.0
+        start = time.monotonic()
+        try:
+            self.session.head(self.url(self.prewarm_path), headers=headers, timeout=self.timeout)
+            self.logger.debug(
+                f"Prewarmed connection in {(time.monotonic() - start) * 1000:.0f}ms "
+                f"(connect {_connect_time.value * 1000:.0f}ms)"
+            )
+        except Exception as e:
+            self.logger.warning(f"Connection prewarm failed: {e}")
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,140 @@
+import logging
+import re
+import time
+from datetime import datetime
+
+from modules.text_utils import normalize_text
+
+
+class IntentRouter:
+    """
+    Answers simple requests locally instead of asking the LLM.
+
+    Intents are declared in config.yaml: each has a builtin handler, a list
+    of regex patterns matched against the normalized transcript, and a
+    response template. All patterns are compiled into one alternation with
+    a named group per intent, so routing is a single regex match. Handlers
+    return template variables (or a full "response") and the router
+    produces the same {"response", "mood"} dict as LLMHandler.
+    """
+
+    def __init__(self, config: dict, audio=None):
+        """
+        Args:
+            config: intents section from config.yaml
+            audio: AudioHandler, used by the stop and volume handlers
+        """
+        self.logger = logging.getLogger("IntentRouter")
+        self.audio = audio
+        self.volume_step = config.get("volume_step", 0.25)
+        self.ignore_words = set(config.get("ignore_words", []))
+
+        handlers = {
+            "time": self._time,
+            "date": self._date,
+            "stop": self._stop,
+            "reply": self._reply,
+            "volume_up": self._volume_up,
+            "volume_down": self._volume_down,
+        }
+
+        self.intents = {}
+        alternatives = []
+        for i, intent in enumerate(config.get("rules", [])):
+            name = intent.get("name", f"intent{i}")
+            handler = handlers.get(intent.get("handler", "reply"))
+            patterns = intent.get("patterns") or []
+            if handler is None or not patterns:
+                self.logger.warning(f"Skipping intent '{name}': unknown handler or no patterns")
+                continue
+            group = f"i{len(self.intents)}"
+            self.intents[group] = {
+                "name": name,
+                "handler": handler,
+                "response": intent.get("response", ""),
+                "mood": intent.get("mood", "neutral"),
+            }
+            alternatives.append(f"(?P<{group}>{'|'.join(f'(?:{p})' for p in patterns)})")
+
+        self._matcher = re.compile("|".join(alternatives)) if alternatives else None
+        self.stats = {"queries": 0, "routed": 0, "match_time_total": 0.0, "match_time_max": 0.0,
+                      "intents": {intent["name"]: 0 for intent in self.intents.values()}}
+        self.logger.info(f"Intent router ready with {len(self.intents)} local intents")
+
+    def route(self, text: str) -> dict | None:
+        """
+        Try to answer ``text`` locally.
+
+        Returns:
+            dict: {"response": str, "mood": str, "intent": str}, or None to
+            hand the query to the LLM
+        """
+        if self._matcher is None or not text:
+            return None
+
+        start = time.perf_counter()
+        words = [w for w in normalize_text(text).split() if w not in self.ignore_words]
+        match = self._matcher.fullmatch(" ".join(words))
+        elapsed = time.perf_counter() - start
+
+        self.stats["queries"] += 1
+        self.stats["match_time_total"] += elapsed
+        self.stats["match_time_max"] = max(self.stats["match_time_max"], elapsed)
+        if match is None:
+            return None
+
+        intent = self.intents[match.lastgroup]
+        try:
+            values = intent["handler"](match)
+        except Exception as e:
+            self.logger.error(f"Intent '{intent['name']}' failed: {e}")
+            return None
+        response = values.pop("response", None) or intent["response"].format(**values)
+
+        self.stats["routed"] += 1
+        self.stats["intents"][intent["name"]] += 1
+        self.logger.info(f"Local intent '{intent['name']}' ({elapsed * 1e6:.0f}us): {response}")
+        return {"response": response, "mood": intent["mood"], "intent": intent["name"]}
+
+    def _time(self, match) -> dict:
+        now = datetime.now()
+        return {"time": f"{now.hour % 12 or 12}:{now.minute:02d} {'AM' if now.hour < 12 else 'PM'}"}
+
+    def _date(self, match) -> dict:
+        now = datetime.now()
+        return {"date": f"{now:%A}, {now:%B} {now.day}", "year": now.year}
+
+    def _reply(self, match) -> dict:
+        return {}
+
+    def _stop(self, match) -> dict:
+        # Drop whatever is still queued for the speaker (e.g. a reply cut off by the wake word)
+        if self.audio is not None:
+            self.audio.flush_playback()
+        return {}
+
+    def _volume_up(self, match) -> dict:
+        return self._change_volume(self.volume_step)
+
+    def _volume_down(self, match) -> dict:
+        return self._change_volume(-self.volume_step)
+
+    def _change_volume(self, step: float) -> dict:
+        if self.audio is None:
+            return {"response": "I can't change the volume right now."}
+        before = self.audio.volume
+        after = self.audio.set_volume(before + step)
+        if after == before:
+            return {"response": "That's as loud as I go." if step > 0 else "That's as quiet as I go."}
+        return {"volume": round(after * 100)}
+
+    def get_stats(self) -> dict:
+        queries = self.stats["queries"]
+        return {
+            "queries": queries,
+            "routed": self.stats["routed"],
+            "routed_ratio": self.stats["routed"] / queries if queries else 0.0,
+            "match_us_mean": self.stats["match_time_total"] / queries * 1e6 if queries else 0.0,
+            "match_us_max": self.stats["match_time_max"] * 1e6,
+            "intents": dict(self.stats["intents"]),
+        }
@@ -1,7 +1,150 @@
-import requests
+import hashlib
 import json
 import logging
 
+from modules.conversation import ConversationMemory
+from modules.http_transport import HTTPTransport
+from modules.response_cache import ResponseCache
+from modules.text_utils import SentenceChunker, split_sentences
+
+VALID_MOODS = ["happy", "neutral", "sad", "excited", "thinking", "curious", "angry", "proud"]
+FALLBACK_RESPONSE = "Sorry, I had trouble connecting to my brain."
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for the flat JSON object the LLM is asked to emit.
+
+    Text is fed as it streams in; string values are reported as fragments
+    while they are still being generated, so callers can act on a field
+    (e.g. "mood") before the object is complete. Only a single top-level
+    object with scalar values is supported, which is all the prompt asks for.
+    If the output does not start with "{" the parser switches to ``plain``
+    mode and the raw text is treated as the response.
+    """
+
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self):
+        self.state = "start"
+        self.plain = False
+        self.done = False
+        self.values = {}
+        self._key = ""
+        self._value = ""
+        self._unicode = ""
+        self._high_surrogate = None
+
+    def feed(self, text: str) -> list:
+        """
+        Consume a chunk of model output.
+
+        Returns:
+            list: Events as (kind, key, text) tuples where kind is
+            "fragment" (partial string value) or "value" (complete value).
+        """
+        events = []
+        fragment = []
+        for ch in text:
+            state = self.state
+            if state == "start":
+                if ch == "{":
+                    self.state = "key_or_end"
+                elif ch.isspace() or ch == "`" or ("`" in self._value and ch.isalnum()):
+                    # Tolerate ```json fences the model was told not to use
+                    self._value += ch
+                else:
+                    self.plain = True
+                    self.state = "plain"
+                    self._value = ""
+                    fragment.append(ch)
+            elif state == "plain":
+                fragment.append(ch)
+            elif state == "key_or_end":
+                if ch == '"':
+                    self._key = ""
+                    self.state = "key"
+                elif ch == "}":
+                    self.state = "end"
+                    self.done = True
+            elif state == "key":
+                if ch == '"':
+                    self.state = "colon"
+                else:
+                    self._key += ch
+            elif state == "colon":
+                if ch == ":":
+                    self.state = "value"
+            elif state == "value":
+                if ch == '"':
+                    self._value = ""
+                    self.state = "string"
+                elif not ch.isspace():
+                    self._value = ch
+                    self.state = "raw"
+            elif state == "string":
+                if ch == "\\":
+                    self.state = "escape"
+                elif ch == '"':
+                    if fragment:
+                        events.append(("fragment", self._key, "".join(fragment)))
+                        fragment = []
+                    self.values[self._key] = self._value
+                    events.append(("value", self._key, self._value))
+                    self.state = "after_value"
+                else:
+                    self._value += ch
+                    fragment.append(ch)
+            elif state == "escape":
+                if ch == "u":
+                    self._unicode = ""
+                    self.state = "unicode"
+                else:
+                    decoded = self._ESCAPES.get(ch, ch)
+                    self._value += decoded
+                    fragment.append(decoded)
+                    self.state = "string"
+            elif state == "unicode":
+                self._unicode += ch
+                if len(self._unicode) == 4:
+                    decoded = self._decode_unicode(int(self._unicode, 16))
+                    self._value += decoded
+                    fragment.append(decoded)
+                    self.state = "string"
+            elif state == "raw":
+                if ch in ",}":
+                    raw = self._value.strip()
+                    try:
+                        value = json.loads(raw)
+                    except json.JSONDecodeError:
+                        value = raw
+                    self.values[self._key] = value
+                    events.append(("value", self._key, value))
+                    self.state = "key_or_end" if ch == "," else "end"
+                    self.done = ch == "}"
+                else:
+                    self._value += ch
+            elif state == "after_value":
+                if ch == ",":
+                    self.state = "key_or_end"
+                elif ch == "}":
+                    self.state = "end"
+                    self.done = True
+
+        if fragment:
+            events.append(("fragment", None if self.plain else self._key, "".join(fragment)))
+        return events
+
+    def _decode_unicode(self, code: int) -> str:
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+        return chr(code)
+
+
 class LLMHandler:
     """
     Handles communication with the Groq LLM API.
@@ -19,9 +162,16 @@ class LLMHandler:
         self.config = config
         self.api_key = config.get("api_key")
         self.model = config.get("model", "llama-3.1-70b-versatile")
-        self.url = "https://api.groq.com/openai/v1/chat/completions"
-        self.max_history = config.get("max_history", 5)
-        self.history = []
+        self.transport = HTTPTransport(config)
+        self.memory = ConversationMemory(config, summarize=self._summarize)
+        self.streaming = config.get("stream", False)
+
+        # Optional cache of replies to short, repeated queries
+        cache_config = config.get("response_cache") or {}
+        self.cache = ResponseCache(cache_config) if cache_config.get("enabled", False) else None
+        # Replies are only reused for the same model, endpoint and prompt
+        scope = "\n".join([self.model, self.transport.base_url, config.get("system_prompt", "")])
+        self._cache_scope = hashlib.sha256(scope.encode("utf-8")).hexdigest()[:16]
         
     def generate_response(self, text: str) -> dict:
         """
@@ -35,26 +185,18 @@ class LLMHandler:
         """
         if not text:
             return {"response": "", "mood": "neutral"}
-            
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        messages = [{"role": "system", "content": self.config.get("system_prompt", "")}]
-        messages.extend(self.history)
-        messages.append({"role": "user", "content": text})
 
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": self.config.get("temperature", 0.7),
-            "max_tokens": self.config.get("max_tokens", 150)
-        }
+        cache_key = self._cache_key(text)
+        cached = self._cached(text, cache_key)
+        if cached:
+            return cached
+            
+        headers = self._headers()
+        payload = self._build_payload(text)
         
         try:
             self.logger.info(f"Sending request to Groq ({self.model})...")
-            response = requests.post(self.url, headers=headers, json=payload)
+            response = self.transport.post("/chat/completions", headers=headers, json=payload)
             response.raise_for_status()
             
             result = response.json()
@@ -67,16 +209,13 @@ class LLMHandler:
                 mood = parsed.get("mood", "neutral")
                 
                 # Basic validation
-                valid_moods = ["happy", "neutral", "sad", "excited", "thinking", "curious", "angry", "proud"]
-                if mood not in valid_moods:
+                if mood not in VALID_MOODS:
                     mood = "neutral"
                     
                 self.logger.info(f"LLM Response: {response_text} [MOOD: {mood}]")
-                self.history.append({"role": "user", "content": text})
-                self.history.append({"role": "assistant", "content": response_text})
-                # Trim to last N exchanges (2 messages per exchange)
-                if len(self.history) > self.max_history * 2:
-                    self.history = self.history[-(self.max_history * 2):]
+                self._remember(text, response_text)
+                if self.cache:
+                    self.cache.put(cache_key, response_text, mood)
                 return {"response": response_text, "mood": mood}
                 
             except json.JSONDecodeError:
@@ -88,4 +227,171 @@ class LLMHandler:
                 self.logger.error(f"LLM request failed: {e} - Response: {response.text}")
             else:
                 self.logger.error(f"LLM request failed: {e}")
-            return {"response": "Sorry, I had trouble connecting to my brain.", "mood": "sad"}
+            return {"response": FALLBACK_RESPONSE, "mood": "sad"}
+
+    def stream_response(self, text: str):
+        """
+        Stream a response from Groq, parsing the JSON object as it arrives.
+
+        The "mood" is yielded as soon as its value is complete and the
+        response text is yielded in sentence-sized chunks, so the caller can
+        switch the face and start speaking before generation finishes.
+
+        Args:
+            text: Transcribed user speech
+
+        Yields:
+            tuple: ("mood", str) once, and ("text", str) for each chunk
+        """
+        if not text:
+            yield ("mood", "neutral")
+            return
+
+        cache_key = self._cache_key(text)
+        cached = self._cached(text, cache_key)
+        if cached:
+            yield ("mood", cached["mood"])
+            for chunk in split_sentences(cached["response"], self.config.get("chunk_max_chars", 150)):
+                yield ("text", chunk)
+            return
+
+        payload = self._build_payload(text)
+        payload["stream"] = True
+
+        parser = IncrementalJSONParser()
+        chunker = SentenceChunker(self.config.get("chunk_max_chars", 150))
+        mood = None
+        spoken = []
+
+        try:
+            self.logger.info(f"Streaming request to Groq ({self.model})...")
+            response = self.transport.post("/chat/completions", headers=self._headers(), json=payload, stream=True)
+            response.raise_for_status()
+
+            for delta in self._iter_sse_content(response):
+                for kind, key, value in parser.feed(delta):
+                    if key == "mood" and kind == "value" and mood is None:
+                        mood = value if value in VALID_MOODS else "neutral"
+                        yield ("mood", mood)
+                    elif key in ("response", None) and kind == "fragment":
+                        for chunk in chunker.feed(value):
+                            spoken.append(chunk)
+                            yield ("text", chunk)
+
+            for chunk in chunker.flush():
+                spoken.append(chunk)
+                yield ("text", chunk)
+
+            if mood is None:
+                mood = "neutral"
+                yield ("mood", mood)
+
+            response_text = " ".join(spoken)
+            if parser.plain:
+                self.logger.warning(f"LLM didn't return valid JSON. Raw output: {response_text}")
+            else:
+                self.logger.info(f"LLM Response: {response_text} [MOOD: {mood}]")
+                self._remember(text, response_text)
+                if self.cache:
+                    self.cache.put(cache_key, response_text, mood)
+
+        except Exception as e:
+            self.logger.error(f"LLM streaming request failed: {e}")
+            if mood is None:
+                yield ("mood", "sad")
+            if not spoken:
+                yield ("text", FALLBACK_RESPONSE)
+
+    def _iter_sse_content(self, response):
+        """Yield content deltas from an OpenAI-compatible SSE stream"""
+        for line in self.transport.iter_lines(response):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                # Read on to the end of the body; closing it early drops the keep-alive connection
+                continue
+            event = json.loads(data)
+            choices = event.get("choices") or []
+            if not choices:
+                continue
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                yield content
+
+    def prewarm(self):
+        """Open the API connection in the background, ahead of the first request"""
+        self.transport.prewarm(self._headers())
+
+    def _cache_key(self, text: str) -> str | None:
+        """Response cache key for ``text`` given the current history (None = don't cache)"""
+        if not self.cache:
+            return None
+        in_conversation = bool(self.memory.messages or self.memory.summary)
+        return self.cache.key(text, self._cache_scope, in_conversation)
+
+    def _cached(self, text: str, key: str | None) -> dict | None:
+        """Return a cached reply (recorded in history like a fresh one), or None"""
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached:
+            self.logger.info(f"LLM Response (cached): {cached['response']} [MOOD: {cached['mood']}]")
+            self._remember(text, cached["response"])
+        return cached
+
+    def get_stats(self) -> dict:
+        return {"cache": self.cache.get_stats() if self.cache else None}
+
+    def cleanup(self):
+        if self.cache:
+            self.logger.info(f"Response cache: {self.cache.get_stats()}")
+        self.transport.close()
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    @property
+    def history(self) -> list:
+        """Messages not yet folded into the summary"""
+        return self.memory.messages
+
+    def compact_history(self):
+        """Summarize old exchanges in the background; call once the reply has been spoken"""
+        self.memory.compact_async()
+
+    def _summarize(self, summary: str, messages: list) -> str:
+        """Ask the LLM to fold ``messages`` into the running summary"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = (
+            f"Previous summary: {summary or '(none)'}\n\nNew conversation:\n{transcript}\n\n"
+            "Write an updated summary of the whole conversation in at most "
+            f"{self.config.get('summary_max_words', 60)} words. Keep names, facts and open questions. "
+            "Reply with the summary only."
+        )
+        payload = {
+            "model": self.config.get("summary_model", self.model),
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.2,
+            "max_tokens": self.config.get("summary_max_tokens", 120),
+        }
+        response = self.transport.post("/chat/completions", headers=self._headers(), json=payload)
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    def _build_payload(self, text: str) -> dict:
+        messages = self.memory.build_messages(self.config.get("system_prompt", ""), text)
+        self.logger.debug(f"Prompt: {len(messages)} messages, ~{self.memory.prompt_tokens(messages)} tokens")
+
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.config.get("temperature", 0.7),
+            "max_tokens": self.config.get("max_tokens", 150)
+        }
+
+    def _remember(self, text: str, response_text: str):
+        self.memory.add(text, response_text)
@@ -0,0 +1,128 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+class PartialUpdateWriter:
+    """
+    Sends only the changed parts of each frame to an SSD1306.
+
+    The last frame written is kept in page layout. Each new frame is diffed
+    against it page by page; for every run of dirty pages the changed
+    column span is sent using the controller's column/page address window,
+    so a blink that touches a few columns costs tens of bytes on the I2C
+    bus instead of the full 1 KB framebuffer. Identical frames send nothing.
+    """
+
+    # luma's I2C serial sends data in blocks of 32 bytes, each with a control byte
+    I2C_BLOCK = 32
+
+    def __init__(self, device, width: int = 128, height: int = 64, stats_window: float = 5.0):
+        """
+        Args:
+            device: luma ssd1306 device (uses command()/data())
+            width: Display width in pixels
+            height: Display height in pixels
+            stats_window: Seconds over which bytes/s is averaged
+        """
+        self.device = device
+        self.width = width
+        self.pages = height // 8
+        self.colstart = getattr(device, "_colstart", 0)
+        self._last = None
+
+        self.stats_window = stats_window
+        self._sent = deque()
+        self.total_bytes = 0
+        self.frames = 0
+        self.full_updates = 0
+        self.skipped_frames = 0
+
+    def invalidate(self):
+        """Forget what is on screen (after clear() or a direct luma draw)"""
+        self._last = None
+
+    def write(self, buf: np.ndarray) -> int:
+        """
+        Show a packed frame (see frame_cache.pack_frame).
+
+        Returns:
+            int: Bytes sent over the bus, including command/control bytes
+        """
+        frame = np.frombuffer(buf, dtype=np.uint8).reshape(self.pages, self.width)
+        if self._last is None:
+            sent = self._send(0, self.pages - 1, 0, self.width - 1, frame)
+            self.full_updates += 1
+        else:
+            sent = 0
+            for p0, p1, c0, c1 in self._dirty_regions(frame != self._last):
+                sent += self._send(p0, p1, c0, c1, frame)
+            if sent == 0:
+                self.skipped_frames += 1
+        self._last = frame.copy()
+
+        self.frames += 1
+        self._record(sent)
+        return sent
+
+    def _dirty_regions(self, changed: np.ndarray) -> list:
+        """
+        Group dirty pages into rectangles (p0, p1, c0, c1).
+
+        Adjacent dirty pages are merged when resending the unchanged bytes
+        in the union costs less than a second address command would.
+        """
+        regions = []
+        for page in np.flatnonzero(changed.any(axis=1)):
+            cols = np.flatnonzero(changed[page])
+            c0, c1 = int(cols[0]), int(cols[-1])
+            if regions:
+                p0, p1, r0, r1 = regions[-1]
+                if p1 == page - 1:
+                    u0, u1 = min(r0, c0), max(r1, c1)
+                    merged = (page - p0 + 1) * (u1 - u0 + 1)
+                    separate = (p1 - p0 + 1) * (r1 - r0 + 1) + (c1 - c0 + 1) + self._command_cost()
+                    if merged <= separate:
+                        regions[-1] = (p0, page, u0, u1)
+                        continue
+            regions.append((int(page), int(page), c0, c1))
+        return regions
+
+    def _command_cost(self) -> int:
+        # control byte + COLUMNADDR, start, end, PAGEADDR, start, end
+        return 7
+
+    def _send(self, p0: int, p1: int, c0: int, c1: int, frame: np.ndarray) -> int:
+        const = self.device._const
+        self.device.command(
+            const.COLUMNADDR, self.colstart + c0, self.colstart + c1,
+            const.PAGEADDR, p0, p1
+        )
+        data = frame[p0:p1 + 1, c0:c1 + 1].ravel()
+        self.device.data(data.tolist())
+        return self._command_cost() + len(data) + -(-len(data) // self.I2C_BLOCK)
+
+    def _record(self, sent: int):
+        now = time.monotonic()
+        self.total_bytes += sent
+        self._sent.append((now, sent))
+        while self._sent and now - self._sent[0][0] > self.stats_window:
+            self._sent.popleft()
+
+    @property
+    def bytes_per_second(self) -> float:
+        if len(self._sent) < 2:
+            return 0.0
+        span = self._sent[-1][0] - self._sent[0][0]
+        return sum(sent for _, sent in self._sent) / span if span > 0 else 0.0
+
+    def get_stats(self) -> dict:
+        return {
+            "bytes_per_second": self.bytes_per_second,
+            "total_bytes": self.total_bytes,
+            "frames": self.frames,
+            "full_updates": self.full_updates,
+            "skipped_frames": self.skipped_frames,
+            "avg_bytes_per_frame": self.total_bytes / self.frames if self.frames else 0.0,
+        }
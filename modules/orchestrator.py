@@ -0,0 +1,391 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import queue
+import threading
+import time
+
+from modules.tracing import Trace
+
+
+class Orchestrator:
+    """
+    Event-driven assistant loop.
+
+    Wake detection, the conversation turn (record -> STT -> LLM -> TTS) and
+    the display run as separate asyncio tasks connected by bounded queues.
+    Every blocking library call runs on a per-stage thread pool, so a slow
+    Whisper decode or Groq request never stalls wake detection or the face.
+
+    Capture is handed over rather than shared: the wake task pauses while a
+    turn records, then resumes from the live edge. While a turn is
+    transcribing, thinking or speaking the wake word stays armed; saying it
+    again cancels that turn (barge-in) and starts a new one. The LLM and
+    TTS stages overlap, connected by a bounded queue of reply chunks.
+    """
+
+    # One TTS worker: a cancelled reply must not speak alongside the next one
+    STAGES = {"capture": 1, "record": 1, "stt": 1, "llm": 2, "tts": 1, "display": 1}
+
+    def __init__(self, config: dict, components: dict):
+        """
+        Args:
+            config: Full configuration from config.yaml
+            components: Initialized modules from build_components()
+                (audio, vad, wake_word, stt, llm, tts, display, router,
+                conditioner, tracer). Components still loading in the
+                background have a future in ``components["loading"]``.
+        """
+        self.logger = logging.getLogger("Orchestrator")
+        self.config = config
+        self.audio = components["audio"]
+        self.vad = components.get("vad")
+        self.wake_word = components["wake_word"]
+        self.components = components
+        self.loading = components.get("loading", {})
+        self.startup = components.get("startup")
+        self.stt = components.get("stt")
+        self.llm = components["llm"]
+        self.tts = components.get("tts")
+        self.display = components.get("display")
+        self.router = components.get("router")
+        self.conditioner = components.get("conditioner")
+        self.tracer = components.get("tracer")
+
+        options = config.get("orchestrator", {})
+        self.queue_size = options.get("queue_size", 4)
+        self.barge_in = options.get("barge_in", True)
+        self.mood_duration = config.get("display", {}).get("mood_duration", 10.0)
+
+        self._executors = {
+            name: concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+            for name, workers in self.STAGES.items()
+        }
+        self._loop = None
+        self._wake_events = None
+        self._display_commands = None
+        self._turn = None
+        self._speaking = None
+
+    async def _run(self, stage: str, func, *args, **kwargs):
+        """Run a blocking call on the stage's thread pool"""
+        return await self._loop.run_in_executor(self._executors[stage], functools.partial(func, *args, **kwargs))
+
+    def _pending(self, name: str) -> bool:
+        """True while ``name`` is still loading in the background"""
+        future = self.loading.get(name)
+        return future is not None and not future.done()
+
+    async def _loaded(self, name: str):
+        """
+        The component ``name``, waiting for it if it is still loading.
+        Raises if loading failed and nothing was put in its place.
+        """
+        future = self.loading.get(name)
+        if future is not None and self.components.get(name) is None:
+            if not future.done():
+                self.logger.info(f"Waiting for {name} to finish loading...")
+            await asyncio.wrap_future(future)
+        return self.components.get(name)
+
+    def _show(self, command: str, arg=None):
+        """Queue a display change; the oldest pending change is dropped if the queue is full"""
+        if self.display is None and not self._pending("display"):
+            return
+        if self._display_commands.full():
+            self._display_commands.get_nowait()
+        self._display_commands.put_nowait((command, arg))
+
+    async def run(self):
+        """Run until cancelled or a stage fails"""
+        self._loop = asyncio.get_running_loop()
+        self._wake_events = asyncio.Queue(maxsize=1)
+        self._display_commands = asyncio.Queue(maxsize=self.queue_size)
+
+        self._show("idle")
+        print("\nVoice Assistant Ready! Say 'computer' to activate.\n")
+        if self.startup:
+            self.startup.mark("listening")
+        tasks = [
+            asyncio.create_task(self._wake_stage(), name="wake"),
+            asyncio.create_task(self._conversation_stage(), name="conversation"),
+            asyncio.create_task(self._display_stage(), name="display"),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks + ([self._turn] if self._turn else []):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.audio.flush_playback()
+            for executor in self._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _wake_stage(self):
+        """Read capture frames and post an event whenever the wake word is heard"""
+        def listen() -> bool:
+            frame = self.audio.read_frame()
+            # Keep the VAD noise floor tracking the room between turns
+            if self.vad: self.vad.process(frame)
+            return self.wake_word.process_frame(frame)
+
+        while True:
+            # Wake word and VAD inference stay on the capture thread, off the event loop
+            if not await self._run("capture", listen):
+                continue
+            if self._turn is not None and not self._turn.done() and not self.barge_in:
+                continue
+
+            trace = Trace()
+            trace.mark("wake")
+            self.logger.info(f"Wake word detected! (trace {trace.trace_id})")
+            print("\n[WAKE WORD DETECTED]")
+            # Hand capture to the new turn and wait until it has finished recording
+            released = asyncio.Event()
+            await self._wake_events.put((released, trace))
+            await released.wait()
+            await self._run("capture", self.audio.flush_input)
+            self.wake_word.reset()
+
+    async def _conversation_stage(self):
+        """Start a turn per wake event, cancelling the one in progress (barge-in)"""
+        while True:
+            released, trace = await self._wake_events.get()
+            if self._turn is not None and not self._turn.done():
+                self.logger.info("Barge-in: cancelling the current turn")
+                self._turn.cancel()
+                await asyncio.gather(self._turn, return_exceptions=True)
+            self._turn = asyncio.create_task(self._run_turn(released, trace), name="turn")
+
+    async def _run_turn(self, released: asyncio.Event, trace: Trace):
+        stop = threading.Event()
+        chunks = queue.Queue()
+        producer = None
+        try:
+            # Release the wake stage however this step ends, or it waits forever
+            try:
+                # Open the LLM connection while the user is still talking
+                self.llm.prewarm()
+                self._show("listening")
+                print("Listening...")
+
+                recording = self.config["recording"]
+                on_frame = None
+                # Frames can only be fed once the streaming model has loaded
+                if self.stt is not None and self.stt.streaming:
+                    self.stt.start_stream()
+                    on_frame = self.stt.accept_frame
+                audio_buffer = await self._run(
+                    "record",
+                    self.audio.record_until_silence,
+                    max_duration=recording["max_duration"],
+                    silence_threshold=recording["silence_threshold"],
+                    silence_duration=recording["silence_duration"],
+                    on_frame=on_frame,
+                    no_speech_timeout=recording.get("no_speech_timeout")
+                )
+            finally:
+                released.set()
+            self._mark_speech(trace, audio_buffer)
+            print("Recording complete.")
+
+            # Cut the recording down to speech; false wakes stop here instead of running Whisper
+            trimmed = False
+            if self.conditioner is not None and audio_buffer is not None:
+                speech = self.conditioner.condition(
+                    audio_buffer, self.audio.last_speech_flags, self.audio.last_energy_db,
+                    self.audio.last_pre_roll_frames
+                )
+                if speech is None:
+                    trace.attrs["no_speech"] = True
+                    print("\n>>> (No speech detected)\n")
+                    self._show("idle")
+                    return
+                audio_buffer, trimmed = speech, True
+
+            self._show("thinking")
+            print("Processing speech...")
+            self.stt = await self._loaded("stt")
+            # The out-of-process worker can abandon a decode; tell it which turn this one belongs to
+            cancellable = {"stop": stop} if hasattr(self.stt, "cancel") else {}
+            text = await self._run("stt", self.stt.transcribe, audio_buffer, vad_filter=not trimmed, **cancellable)
+            trace.mark("stt_done")
+            trace.attrs["transcript_chars"] = len(text or "")
+            decode = getattr(self.stt, "last_decode", None) or {}
+            if decode.get("escalated"):
+                trace.attrs["stt_escalated"] = decode.get("reason")
+            if not text:
+                print("\n>>> (No speech detected)\n")
+                self._show("idle")
+                return
+
+            local = self.router.route(text) if self.router else None
+            if local is not None:
+                trace.attrs["intent"] = local.get("intent")
+            replies = asyncio.Queue(maxsize=self.queue_size)
+            producer = asyncio.create_task(self._llm_stage(text, local, replies, stop, trace))
+            spoken = await self._tts_stage(replies, chunks, stop, trace)
+            await producer
+            trace.mark("playback_end")
+
+            if spoken:
+                self._show("idle")
+            else:
+                # Nothing was said: leave the mood face up for a while without blocking
+                self._show("hold", self.mood_duration)
+
+            # Reply is out; summarize old turns while we wait for the next one
+            if local is None:
+                self.llm.compact_history()
+            print("Ready for next command.")
+
+        except asyncio.CancelledError:
+            trace.attrs["cancelled"] = True
+            # Threads can't be interrupted, so tell each stage to give up
+            stop.set()
+            chunks.put(None)
+            # Flush so the old speak_stream stops waiting on playback, let it finish,
+            # then flush whatever it queued in between
+            self.audio.flush_playback()
+            if self._speaking is not None:
+                await asyncio.gather(asyncio.wrap_future(self._speaking), return_exceptions=True)
+            self.audio.flush_playback()
+            if self.stt is not None and hasattr(self.stt, "cancel"):
+                self.stt.cancel()
+            raise
+        except Exception as e:
+            trace.attrs["error"] = str(e)
+            self.logger.error(f"Turn failed: {e}")
+            # Let the LLM worker give up on the bounded queue and free its executor thread
+            stop.set()
+            chunks.put(None)
+            if producer is not None:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+            self._show("idle")
+        finally:
+            if self.tracer:
+                self.tracer.finish(trace)
+
+    def _mark_speech(self, trace: Trace, audio_buffer):
+        """Mark the endpoint, and speech start from the VAD decisions if available"""
+        trace.mark("endpoint")
+        flags = getattr(self.audio, "last_speech_flags", None)
+        sample_rate = getattr(self.audio, "sample_rate", 16000)
+        # The pre-roll holds the wake word itself; speech there is not the request
+        pre_roll = min(getattr(self.audio, "last_pre_roll_frames", 0), len(flags) if flags is not None else 0)
+        if flags is None or not flags[pre_roll:].any() or audio_buffer is None:
+            return
+        # Flags cover the returned buffer frame by frame; count back from its end
+        frame = len(audio_buffer) / len(flags)
+        speech_start = (int(flags[pre_roll:].argmax()) + pre_roll) * frame
+        trace.mark("speech_start", at=trace.events["endpoint"] - (len(audio_buffer) - speech_start) / sample_rate)
+
+    async def _llm_stage(self, text: str, local: dict, replies: asyncio.Queue, stop: threading.Event, trace: Trace):
+        """Produce ("mood", m) / ("text", chunk) items into ``replies``, then None"""
+
+        def put(item) -> bool:
+            # Bounded hand-off from the worker thread; gives up once the turn is cancelled
+            future = asyncio.run_coroutine_threadsafe(replies.put(item), self._loop)
+            while True:
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        def produce():
+            requested = time.monotonic()
+            if local is not None:
+                items = [("mood", local["mood"]), ("text", local["response"])]
+            elif self.llm.streaming:
+                items = self.llm.stream_response(text)
+            else:
+                reply = self.llm.generate_response(text)
+                items = [("mood", reply["mood"]), ("text", reply["response"])]
+            for item in items:
+                if item[0] == "text":
+                    trace.mark("llm_first_text")
+                if stop.is_set() or not put(item):
+                    return
+            trace.mark("llm_done")
+            timing = getattr(getattr(self.llm, "transport", None), "last_timing", None) or {}
+            if local is None and timing.get("started", 0) >= requested:
+                trace.mark("llm_first_byte", at=timing["started"] + timing["ttfb"])
+            put(None)
+
+        try:
+            await self._run("llm", produce)
+        except Exception as e:
+            self.logger.error(f"LLM stage failed: {e}")
+            await replies.put(None)
+
+    async def _tts_stage(self, replies: asyncio.Queue, chunks: queue.Queue, stop: threading.Event,
+                         trace: Trace) -> bool:
+        """Speak text chunks as they arrive; returns True if anything was spoken"""
+
+        def chunk_iter():
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    return
+                yield chunk
+
+        speaking = None
+        self.tts = await self._loaded("tts")
+        if self.tts and self.tts.available:
+            # Kept as a thread future so a cancelled turn can wait for it to actually stop
+            self._speaking = self._executors["tts"].submit(
+                self.tts.speak_stream, chunk_iter(), on_first_audio=lambda: trace.mark("tts_first_audio"), stop=stop
+            )
+            speaking = asyncio.wrap_future(self._speaking)
+
+        print("\n[AI RESPONSE]")
+        try:
+            while True:
+                item = await replies.get()
+                if item is None:
+                    break
+                kind, value = item
+                if kind == "mood":
+                    self._show("mood", value)
+                    print(f"[MOOD: {value.upper()}]")
+                else:
+                    print(f">>> {value}")
+                    chunks.put(value)
+        finally:
+            chunks.put(None)
+        print()
+        return bool(await speaking) if speaking else False
+
+    async def _display_stage(self):
+        """Apply display changes in order; "hold" returns to idle after a delay"""
+        # Changes queued while the display was loading are applied once it is up
+        self.display = await self._loaded("display")
+        if self.display is None:
+            return
+        faces = {
+            "idle": lambda _: self.display.show_idle_face(),
+            "listening": lambda _: self.display.show_listening_face(),
+            "thinking": lambda _: self.display.show_thinking_face(),
+            "mood": lambda mood: self.display.show_mood_face(mood),
+        }
+        hold = None
+        while True:
+            try:
+                command, arg = await asyncio.wait_for(self._display_commands.get(), timeout=hold)
+            except asyncio.TimeoutError:
+                command, arg = "idle", None
+            hold = None
+            if command == "hold":
+                hold = arg
+                continue
+            try:
+                await self._run("display", faces[command], arg)
+            except Exception as e:
+                self.logger.error(f"Display update failed: {e}")
@@ -0,0 +1,144 @@
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+import pyaudio
+
+
+class PlaybackEngine:
+    """
+    Long-lived output stream fed from a queue by a PortAudio callback.
+
+    Opening a stream per utterance costs device open/close latency and
+    blocks the caller for the whole playback. Here the stream stays open
+    (playing silence when idle); callers enqueue clips and get back a
+    position mark they can wait on. Clips are converted to the stream's
+    sample rate on enqueue, so sources at different rates (sherpa-onnx,
+    espeak-ng) share one stream.
+    """
+
+    def __init__(self, pa, device_index, sample_rate: int = 22050, frames_per_buffer: int = 1024):
+        """
+        Args:
+            pa: PyAudio instance owned by AudioHandler
+            device_index: Output device index
+            sample_rate: Rate the output stream is opened at
+            frames_per_buffer: Callback block size
+        """
+        self.logger = logging.getLogger("Playback")
+        self.pa = pa
+        self.device_index = device_index
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.stream = None
+        self.gain = 1.0            # applied at output time, so changes affect audio already queued
+
+        self._clips = deque()
+        self._offset = 0           # read offset into the clip at the head of the queue
+        self._queued_end = 0       # queue position after the last queued sample
+        self._consumed = 0         # queue position played or flushed so far
+        self._played = 0           # samples actually sent to the device
+        self._cond = threading.Condition()
+
+    def start(self):
+        """Open the output stream (idempotent)"""
+        if self.stream is not None:
+            return
+        self.stream = self.pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            output=True,
+            output_device_index=self.device_index,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._callback
+        )
+        self.logger.info(f"Playback stream opened at {self.sample_rate} Hz")
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        out = np.zeros(frame_count, dtype=np.int16)
+        filled = 0
+        with self._cond:
+            while filled < frame_count and self._clips:
+                clip = self._clips[0]
+                n = min(frame_count - filled, len(clip) - self._offset)
+                out[filled:filled + n] = clip[self._offset:self._offset + n]
+                filled += n
+                self._offset += n
+                if self._offset >= len(clip):
+                    self._clips.popleft()
+                    self._offset = 0
+            if filled:
+                self._played += filled
+                self._consumed += filled
+                self._cond.notify_all()
+        if filled and self.gain != 1.0:
+            out = np.clip(out * self.gain, -32768, 32767).astype(np.int16)
+        return (out.tobytes(), pyaudio.paContinue)
+
+    def resample(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Linear-interpolation resample to the stream rate"""
+        if sample_rate == self.sample_rate or len(samples) == 0:
+            return samples
+        n_out = int(round(len(samples) * self.sample_rate / sample_rate))
+        positions = np.arange(n_out) * (sample_rate / self.sample_rate)
+        resampled = np.interp(positions, np.arange(len(samples)), samples.astype(np.float32))
+        return resampled.astype(np.int16)
+
+    def enqueue(self, samples: np.ndarray, sample_rate: int) -> int:
+        """
+        Queue int16 mono samples for playback without blocking.
+
+        Returns:
+            int: Position mark; wait(mark) returns once this clip has played
+        """
+        self.start()
+        clip = self.resample(samples, sample_rate)
+        with self._cond:
+            if len(clip):
+                self._clips.append(clip)
+                self._queued_end += len(clip)
+            return self._queued_end
+
+    def flush(self):
+        """Drop everything not yet played and release any waiters"""
+        with self._cond:
+            self._clips.clear()
+            self._offset = 0
+            self._consumed = self._queued_end
+            self._cond.notify_all()
+
+    def wait(self, mark: int = None, timeout: float = None) -> bool:
+        """
+        Block until the audio up to ``mark`` (default: everything queued) has played.
+
+        Returns:
+            bool: False on timeout
+        """
+        with self._cond:
+            if mark is None:
+                mark = self._queued_end
+            return self._cond.wait_for(lambda: self._consumed >= mark, timeout=timeout)
+
+    @property
+    def samples_played(self) -> int:
+        return self._played
+
+    @property
+    def pending_samples(self) -> int:
+        return self._queued_end - self._consumed
+
+    @property
+    def busy(self) -> bool:
+        return self.pending_samples > 0
+
+    def close(self):
+        self.flush()
+        if self.stream is not None:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing playback stream: {e}")
+            self.stream = None
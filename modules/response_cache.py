@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from modules.text_utils import normalize_text
+
+# Replies to these don't depend on what was said before
+DEFAULT_CONTEXT_FREE = [
+    "thank you", "thanks", "hello", "hi", "good morning", "good night", "goodbye", "bye",
+]
+
+
+class ResponseCache:
+    """
+    LRU cache of LLM replies keyed on the normalized transcript.
+
+    Household queries repeat a lot ("thank you", "good night"), and a cached
+    reply skips the Groq round trip entirely. Only short queries are cached,
+    since longer ones rarely repeat word for word. Keys are scoped by the
+    caller (model, endpoint, system prompt), so changing any of them never
+    serves replies produced under the old settings.
+
+    By default only the ``context_free`` phrases are cached: "what's the
+    weather" or "tell me a joke" are short too, but their answer changes.
+    With ``cache_all`` other short queries are cached as well, for
+    ``other_ttl`` seconds and only before a conversation is under way
+    ("why" or "yes" mean something different in every conversation).
+    Context-free replies expire after ``ttl`` seconds. The cache is
+    persisted as JSON so it survives restarts.
+    """
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: llm.response_cache section from config.yaml
+        """
+        self.logger = logging.getLogger("ResponseCache")
+        self.ttl = config.get("ttl", 86400.0)
+        self.cache_all = config.get("cache_all", False)
+        self.other_ttl = config.get("other_ttl", 600.0)
+        self.max_entries = config.get("max_entries", 200)
+        self.max_query_words = config.get("max_query_words", 6)
+        self.context_free = {normalize_text(q) for q in config.get("context_free", DEFAULT_CONTEXT_FREE)}
+        self.path = config.get("path") or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "responses.json"
+        )
+
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def key(self, text: str, scope: str = "", in_conversation: bool = False) -> str | None:
+        """
+        Cache key for ``text``, or None if the query should not be cached.
+
+        Args:
+            text: User query
+            scope: Identifies what produced the reply (see LLMHandler)
+            in_conversation: True if earlier turns are part of the prompt
+        """
+        normalized = normalize_text(text)
+        if not normalized or len(normalized.split()) > self.max_query_words:
+            return None
+        if normalized not in self.context_free and (in_conversation or not self.cache_all):
+            return None
+        return f"{scope}|{normalized}" if scope else normalized
+
+    def get(self, key: str) -> dict | None:
+        """
+        Look up a reply by key (see key()).
+
+        Returns:
+            dict: {"response": str, "mood": str}, or None on a miss
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] > entry.get("ttl", self.ttl):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        self.logger.info(f"Cache hit for '{key}'")
+        return {"response": entry["response"], "mood": entry["mood"]}
+
+    def put(self, key: str, response: str, mood: str):
+        """Store a reply under ``key`` (see key()) and write the cache to disk"""
+        if key is None or not response:
+            return
+        with self._lock:
+            ttl = self.ttl if key.rsplit("|", 1)[-1] in self.context_free else self.other_ttl
+            self._entries[key] = {"response": response, "mood": mood, "created": time.time(), "ttl": ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self.save()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable response cache {self.path}: {e}")
+            return
+
+        now = time.time()
+        # Stored oldest first, so insertion order restores the LRU order
+        for key, entry in entries.items():
+            if now - entry.get("created", 0) <= entry.get("ttl", self.ttl):
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.logger.info(f"Loaded {len(self._entries)} cached responses")
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._entries)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Could not save response cache: {e}")
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
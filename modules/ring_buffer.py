@@ -0,0 +1,160 @@
+import threading
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size int16 ring buffer fed by the capture callback.
+
+    The storage is mirrored (every sample is written twice, ``capacity``
+    apart) so any window of up to ``capacity`` samples is a contiguous slice
+    and can be handed to consumers as a zero-copy NumPy view.
+
+    Positions are absolute sample counts since capture started, so readers
+    keep their own cursor and never interfere with each other or with the
+    writer. Memory use is constant: the writer simply overwrites the oldest
+    audio, and a reader that falls more than ``capacity`` samples behind is
+    moved forward instead of blocking capture.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Allocate the buffer.
+
+        Args:
+            capacity: Number of samples kept (e.g. 30s * 16000)
+        """
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+        self.capacity = capacity
+        self._data = np.zeros(capacity * 2, dtype=np.int16)
+        self._write_pos = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def write_position(self) -> int:
+        """Absolute position of the next sample to be written"""
+        return self._write_pos
+
+    @property
+    def oldest_position(self) -> int:
+        """Absolute position of the oldest sample still held"""
+        return max(0, self._write_pos - self.capacity)
+
+    def write(self, samples: np.ndarray):
+        """
+        Append samples, overwriting the oldest audio when full.
+
+        Called from the PortAudio callback thread, so it never blocks on
+        readers and never allocates.
+        """
+        n = len(samples)
+        if n == 0:
+            return
+        # Only the newest ``capacity`` samples of an oversized write are kept
+        skipped = 0
+        if n > self.capacity:
+            skipped = n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        start = (self._write_pos + skipped) % self.capacity
+        first = min(n, self.capacity - start)
+        # Primary copy
+        self._data[start:start + first] = samples[:first]
+        self._data[:n - first] = samples[first:]
+        # Mirror copy
+        self._data[self.capacity + start:self.capacity + start + first] = samples[:first]
+        self._data[self.capacity:self.capacity + n - first] = samples[first:]
+
+        with self._cond:
+            self._write_pos += skipped + n
+            self._cond.notify_all()
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        """
+        Zero-copy view of samples in [start, end).
+
+        The view stays valid until the writer laps it, i.e. for roughly
+        ``capacity - (end - start)`` samples of further capture.
+        """
+        if end - start > self.capacity:
+            raise ValueError("Requested window is larger than the ring buffer")
+        if start < self.oldest_position or end > self._write_pos:
+            raise IndexError(f"Window [{start}, {end}) is not in the buffer")
+        offset = start % self.capacity
+        return self._data[offset:offset + (end - start)]
+
+    def wait_for(self, position: int, timeout: float = None) -> bool:
+        """Block until ``position`` samples have been written. Returns False on timeout/close."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._write_pos >= position or self._closed, timeout=timeout
+            ) and not self._closed
+
+    def cursor(self, position: int = None) -> "RingCursor":
+        """Create a reader starting at ``position`` (default: the live edge)"""
+        if position is None:
+            position = self._write_pos
+        return RingCursor(self, max(position, self.oldest_position))
+
+    def close(self):
+        """Wake up any blocked readers (capture stopped)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+
+class RingCursor:
+    """
+    Independent read position into an AudioRingBuffer.
+
+    Each consumer (wake word, recorder, VAD) owns one cursor; reads return
+    views into the shared buffer instead of copies.
+    """
+
+    def __init__(self, ring: AudioRingBuffer, position: int):
+        self.ring = ring
+        self.position = position
+        self.dropped = 0  # samples skipped because this reader fell behind
+
+    @property
+    def available(self) -> int:
+        """Samples ready to be read without blocking"""
+        return self.ring.write_position - self.position
+
+    def seek(self, position: int):
+        """Move the cursor, clamped to the audio still held in the ring"""
+        self.position = min(max(position, self.ring.oldest_position), self.ring.write_position)
+
+    def read(self, n: int, timeout: float = None) -> np.ndarray:
+        """
+        Read the next ``n`` samples as a view, blocking until they exist.
+
+        Raises:
+            TimeoutError: If capture did not produce the samples in time
+        """
+        oldest = self.ring.oldest_position
+        if self.position < oldest:
+            # Consumer was too slow; skip ahead rather than hold up capture
+            self.dropped += oldest - self.position
+            self.position = oldest
+
+        if not self.ring.wait_for(self.position + n, timeout=timeout):
+            raise TimeoutError("No audio from capture stream")
+
+        # Re-check in case the writer lapped us while we waited
+        oldest = self.ring.oldest_position
+        if self.position < oldest:
+            self.dropped += oldest - self.position
+            self.position = oldest
+
+        frame = self.ring.view(self.position, self.position + n)
+        self.position += n
+        return frame
@@ -1,99 +1,387 @@
-from faster_whisper import WhisperModel
 import numpy as np
 import logging
 import os
+import threading
+import time
 
 class SpeechToText:
     """
     Transcribes audio to text using Faster-Whisper.
     Runs locally on CPU with int8 quantization for speed.
+
+    With ``backend: sherpa-onnx`` a streaming transducer (zipformer) model is
+    used instead: frames are fed while recording is still running, so the
+    transcript is ready almost as soon as the endpoint is reached.
+
+    With ``cascade`` enabled, every utterance is decoded by the fast model
+    first. If its segments look unsure (low average log-probability, or a
+    high no-speech probability) the audio is decoded again by a larger
+    model. With ``preload`` the larger model loads in the background right
+    after warm_up(); otherwise it is loaded the first time it is needed.
     """
-    
+
     def __init__(self, config: dict):
         """
-        Initialize Faster-Whisper model.
-        
+        Initialize the configured STT backend.
+
         Args:
             config: STT configuration from config.yaml
         """
         self.logger = logging.getLogger("SpeechToText")
         self.config = config
-        
-        model_size = config.get("model", "tiny.en")
-        device = config.get("device", "cpu")
-        compute_type = config.get("compute_type", "int8")
-        
+        self.backend = config.get("backend", "faster-whisper")
+        self.model = None
+        self.batched = None
+        self.batch_size = config.get("batch_size", 0)
+        self.recognizer = None
+        self._stream = None
+        self._stream_samples = 0
+
+        # Cascaded decoding: larger model for low-confidence utterances
+        self.cascade = None
+        self.fallback = None
+        self.last_decode = {}
+        self._fallback_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"decodes": 0, "escalations": 0, "fast_time": 0.0, "slow_time": 0.0, "fallback_load_time": None}
+
         # Check for Optimized Mode
         self.optimized = config.get("OPTIMIZED_MODE", 0) == 1
-        
+
+        if self.backend == "sherpa-onnx":
+            self._init_streaming()
+        else:
+            self._init_whisper()
+
+    def _init_whisper(self):
+        self.model = self._load_whisper(self.config.get("model", "tiny.en"))
+
+        # Long recordings are split on speech and the pieces decoded together
+        if self.batch_size > 1:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+                self.batched = BatchedInferencePipeline(model=self.model)
+            except ImportError:  # pragma: no cover - older faster-whisper
+                self.logger.warning("This faster-whisper has no BatchedInferencePipeline; decoding unbatched")
+
+        cascade = self.config.get("cascade") or {}
+        if cascade.get("enabled", False):
+            self.cascade = cascade
+            self.logger.info(
+                f"Cascade enabled: low-confidence utterances are re-decoded with {cascade.get('model', 'base.en')}"
+            )
+
+    def _load_whisper(self, model_size: str):
+        device = self.config.get("device", "cpu")
+        compute_type = self.config.get("compute_type", "int8")
+
         # Set hardware parameters
         if self.optimized:
             cpu_threads = 4
-            num_workers = 1
-            self.logger.info("OPTIMIZED_MODE is ON: Using 4 threads, 1 worker, beam_size 1")
+            num_workers = self.config.get("num_workers", 1)
+            self.logger.info(f"OPTIMIZED_MODE is ON: Using 4 threads, {num_workers} worker(s), beam_size 1")
         else:
-            cpu_threads = config.get("cpu_threads", 0) # 0 lets faster-whisper decide
-            num_workers = config.get("num_workers", 1)
+            cpu_threads = self.config.get("cpu_threads", 0) # 0 lets faster-whisper decide
+            num_workers = self.config.get("num_workers", 1)
             self.logger.info("OPTIMIZED_MODE is OFF: Using standard settings")
 
         self.logger.info(f"Loading Whisper model: {model_size} on {device} ({compute_type})")
-        
+
         try:
-            self.model = WhisperModel(
-                model_size, 
-                device=device, 
+            # Imported on first use: faster-whisper pulls in CTranslate2 and PyAV, which take seconds
+            from faster_whisper import WhisperModel
+            model = WhisperModel(
+                model_size,
+                device=device,
                 compute_type=compute_type,
                 cpu_threads=cpu_threads,
                 num_workers=num_workers,
                 download_root=os.path.join(os.path.expanduser("~"), ".cache/huggingface/hub")
             )
             self.logger.info("Whisper model loaded successfully")
+            return model
         except Exception as e:
             self.logger.error(f"Failed to load Whisper model: {e}")
             raise
 
-    def transcribe(self, audio_data: bytes, sample_rate: int = 16000) -> str:
+    def _get_fallback(self):
+        """The larger cascade model, loaded on first use (None if it can't be loaded)"""
+        with self._fallback_lock:
+            if self.fallback is None and self.cascade is not None:
+                start = time.monotonic()
+                try:
+                    self.fallback = self._load_whisper(self.cascade.get("model", "base.en"))
+                    self._stats["fallback_load_time"] = time.monotonic() - start
+                except Exception as e:
+                    self.logger.error(f"Cascade disabled, fallback model failed to load: {e}")
+                    self.cascade = None
+            return self.fallback
+
+    def _preload_fallback(self):
+        """Load and warm up the cascade model so the first escalation doesn't pay for it"""
+        model = self._get_fallback()
+        if model is not None:
+            noise = (np.random.default_rng(0).standard_normal(16000) * 30).astype(np.float32) / 32768.0
+            self._decode(model, None, noise, vad_filter=False)
+            self.logger.info(f"Cascade model ready (loaded in {self._stats['fallback_load_time']:.2f}s)")
+
+    def _init_streaming(self):
+        try:
+            import sherpa_onnx
+        except Exception as e:
+            raise RuntimeError(f"sherpa-onnx is not installed; cannot use the streaming STT backend ({e})")
+
+        model_path = self.config.get("streaming_model_path", "")
+        if not model_path:
+            raise ValueError("STT streaming_model_path is not set")
+        model_dir = os.path.abspath(model_path)
+
+        # File names vary per release; prefer the int8 exports when compute_type asks for it
+        prefer_int8 = self.config.get("compute_type", "int8") == "int8"
+
+        def find(part):
+            candidates = sorted(f for f in os.listdir(model_dir) if part in f and f.endswith(".onnx"))
+            if not candidates:
+                raise FileNotFoundError(f"No {part} .onnx file found in {model_dir}")
+            quantized = [f for f in candidates if ".int8." in f]
+            plain = [f for f in candidates if ".int8." not in f]
+            chosen = (quantized or plain) if prefer_int8 else (plain or quantized)
+            return os.path.join(model_dir, chosen[0])
+
+        tokens_file = os.path.join(model_dir, "tokens.txt")
+        if not os.path.exists(tokens_file):
+            raise FileNotFoundError(f"Missing STT tokens file: {tokens_file}")
+
+        self.logger.info(f"Loading streaming STT model from {model_dir}")
+        try:
+            self.recognizer = sherpa_onnx.OnlineRecognizer.from_transducer(
+                tokens=tokens_file,
+                encoder=find("encoder"),
+                decoder=find("decoder"),
+                joiner=find("joiner"),
+                num_threads=self.config.get("streaming_num_threads", 2),
+                sample_rate=16000,
+                feature_dim=80,
+                decoding_method="greedy_search",
+                provider=self.config.get("device", "cpu"),
+            )
+            self.logger.info("Streaming STT model loaded successfully")
+        except Exception as e:
+            self.logger.error(f"Failed to load streaming STT model: {e}")
+            raise
+
+    @property
+    def streaming(self) -> bool:
+        """True if frames can be fed during recording (see start_stream)"""
+        return self.recognizer is not None
+
+    def start_stream(self):
+        """Begin a new utterance for the streaming backend"""
+        if not self.streaming:
+            return
+        self._stream = self.recognizer.create_stream()
+        self._stream_samples = 0
+
+    def accept_frame(self, frame, sample_rate: int = 16000):
+        """
+        Feed one captured frame to the streaming recognizer.
+
+        Decoding runs incrementally here, so by the time recording stops
+        only the last few frames are left to process.
+        """
+        if self._stream is None:
+            return
+        try:
+            samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768.0
+            self._stream.accept_waveform(sample_rate, samples)
+            self._stream_samples += len(samples)
+            while self.recognizer.is_ready(self._stream):
+                self.recognizer.decode_stream(self._stream)
+        except Exception as e:
+            self.logger.error(f"Streaming STT failed: {e}")
+            self._stream = None
+
+    def finish_stream(self, sample_rate: int = 16000) -> str:
+        """Flush the streaming recognizer and return the final transcript"""
+        if self._stream is None:
+            return ""
+        stream, self._stream = self._stream, None
+        try:
+            # Trailing padding lets the model emit the last tokens
+            stream.accept_waveform(sample_rate, np.zeros(int(0.3 * sample_rate), dtype=np.float32))
+            stream.input_finished()
+            while self.recognizer.is_ready(stream):
+                self.recognizer.decode_stream(stream)
+            result = self.recognizer.get_result(stream)
+            # Older sherpa-onnx releases return a result object instead of a str
+            full_text = getattr(result, "text", result).strip()
+            self.logger.info(f"Transcription (streaming): '{full_text}'")
+            return full_text
+        except Exception as e:
+            self.logger.error(f"Transcription failed: {e}")
+            return ""
+
+    def transcribe(self, audio_data, sample_rate: int = 16000, vad_filter: bool = True) -> str:
         """
         Transcribe audio bytes to text.
-        
+
+        For the streaming backend, if frames were already fed via
+        accept_frame this only finalizes that stream.
+
         Args:
-            audio_data: Raw audio bytes (WAV format / PCM)
+            audio_data: Raw int16 PCM as bytes or a NumPy int16 array
             sample_rate: Audio sample rate (default 16000)
-            
+            vad_filter: Run Whisper's own VAD first; pass False for audio
+                already trimmed to speech
+
         Returns:
             str: Transcribed text
         """
-        if not audio_data:
+        if self.streaming:
+            if self._stream is None or self._stream_samples == 0:
+                if audio_data is None or len(audio_data) == 0:
+                    return ""
+                self.start_stream()
+                self.accept_frame(audio_data, sample_rate)
+            return self.finish_stream(sample_rate)
+
+        if audio_data is None or len(audio_data) == 0:
             return ""
-            
+
         try:
             # Convert audio bytes to numpy float32 array normalized to [-1, 1]
             audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-            
-            # Use optimized beam size if enabled
-            beam_size = 1 if self.optimized else self.config.get("beam_size", 5)
-            
-            segments, info = self.model.transcribe(
-                audio_np, 
-                beam_size=beam_size,
-                language=self.config.get("language", "en"),
-                vad_filter=True
-            )
-            
-            # segments is a generator, so we need to iterate to get text
-            text_segments = [segment.text for segment in segments]
-            full_text = " ".join(text_segments).strip()
-            
+
+            start = time.monotonic()
+            full_text, segments, info = self._decode(self.model, self.batched, audio_np, vad_filter)
+            decode = {"model": self.config.get("model", "tiny.en"), "escalated": False,
+                      "fast_time": time.monotonic() - start}
+
+            if self.cascade is not None and segments:
+                avg_logprob, no_speech_prob = self._confidence(segments)
+                decode.update(avg_logprob=avg_logprob, no_speech_prob=no_speech_prob)
+                reason = self._escalation_reason(avg_logprob, no_speech_prob)
+                fallback = self._get_fallback() if reason else None
+                if fallback is not None:
+                    start = time.monotonic()
+                    full_text, segments, info = self._decode(fallback, None, audio_np, vad_filter)
+                    decode.update(model=self.cascade.get("model", "base.en"), escalated=True, reason=reason,
+                                  slow_time=time.monotonic() - start)
+                    self.logger.info(
+                        f"Escalated to {decode['model']} ({reason}); "
+                        f"+{decode['slow_time'] * 1000:.0f}ms after {decode['fast_time'] * 1000:.0f}ms"
+                    )
+            self._record(decode)
+
             self.logger.info(f"Transcription: '{full_text}' (prob: {info.language_probability:.2f})")
             return full_text
-            
+
         except Exception as e:
             self.logger.error(f"Transcription failed: {e}")
             return ""
 
+    def warm_up(self) -> float:
+        """
+        Decode a second of quiet noise once, so the first real utterance
+        doesn't pay for memory allocation and kernel setup. Not counted in
+        the stats and never escalates. With ``cascade.preload`` the larger
+        model then starts loading in the background, so the fast model is
+        usable right away.
+
+        Returns:
+            float: Seconds spent
+        """
+        start = time.monotonic()
+        noise = (np.random.default_rng(0).standard_normal(16000) * 30).astype(np.int16)
+        try:
+            if self.streaming:
+                self.start_stream()
+                self.accept_frame(noise)
+                self.finish_stream()
+            elif self.model is not None:
+                self._decode(self.model, None, noise.astype(np.float32) / 32768.0, vad_filter=False)
+        except Exception as e:
+            self.logger.warning(f"STT warm-up failed: {e}")
+        elapsed = time.monotonic() - start
+        self.logger.info(f"STT warm-up took {elapsed:.2f}s")
+        if self.cascade is not None and self.cascade.get("preload", True) and self.fallback is None:
+            threading.Thread(target=self._preload_fallback, name="stt-fallback-load", daemon=True).start()
+        return elapsed
+
+    def _decode(self, model, batched, audio_np: np.ndarray, vad_filter: bool = True) -> tuple:
+        """Run one Whisper model; returns (text, segments, info)"""
+        # Use optimized beam size if enabled
+        beam_size = 1 if self.optimized else self.config.get("beam_size", 5)
+
+        # The batched pipeline splits long audio with the VAD; trimmed utterances are short
+        if batched is not None and vad_filter:
+            segments, info = batched.transcribe(
+                audio_np,
+                beam_size=beam_size,
+                language=self.config.get("language", "en"),
+                batch_size=self.batch_size
+            )
+        else:
+            segments, info = model.transcribe(
+                audio_np,
+                beam_size=beam_size,
+                language=self.config.get("language", "en"),
+                vad_filter=vad_filter
+            )
+
+        # segments is a generator, so we need to iterate to get text
+        segments = list(segments)
+        return " ".join(segment.text for segment in segments).strip(), segments, info
+
+    @staticmethod
+    def _confidence(segments: list) -> tuple:
+        """Duration-weighted average log-probability and no-speech probability"""
+        weights = [max(segment.end - segment.start, 0.01) for segment in segments]
+        total = sum(weights)
+        avg_logprob = sum(w * segment.avg_logprob for w, segment in zip(weights, segments)) / total
+        no_speech_prob = sum(w * segment.no_speech_prob for w, segment in zip(weights, segments)) / total
+        return avg_logprob, no_speech_prob
+
+    def _escalation_reason(self, avg_logprob: float, no_speech_prob: float) -> str | None:
+        if avg_logprob < self.cascade.get("min_avg_logprob", -0.6):
+            return f"avg_logprob {avg_logprob:.2f}"
+        if no_speech_prob > self.cascade.get("max_no_speech_prob", 0.5):
+            return f"no_speech_prob {no_speech_prob:.2f}"
+        return None
+
+    def _record(self, decode: dict):
+        self.last_decode = decode
+        with self._stats_lock:
+            self._stats["decodes"] += 1
+            self._stats["fast_time"] += decode["fast_time"]
+            if decode["escalated"]:
+                self._stats["escalations"] += 1
+                self._stats["slow_time"] += decode["slow_time"]
+
+    def get_stats(self) -> dict:
+        """How often the cascade escalated and what it cost"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        decodes = stats["decodes"]
+        escalations = stats["escalations"]
+        return {
+            "decodes": decodes,
+            "escalations": escalations,
+            "escalation_rate": escalations / decodes if decodes else 0.0,
+            "fast_ms_mean": stats["fast_time"] / decodes * 1000 if decodes else 0.0,
+            # Extra decode time per escalated utterance, and averaged over all of them
+            "escalation_ms_mean": stats["slow_time"] / escalations * 1000 if escalations else 0.0,
+            "added_ms_per_decode": stats["slow_time"] / decodes * 1000 if decodes else 0.0,
+            "fallback_load_s": stats["fallback_load_time"],
+        }
+
     def cleanup(self):
         """Clean up model resources"""
         # Faster-whisper doesn't have explicit cleanup, but we can delete the object
-        if hasattr(self, 'model'):
-            del self.model
-            self.logger.info("STT resources released")
+        if self.model is not None:
+            self.model = None
+        self.batched = None
+        self.fallback = None
+        self._stream = None
+        self.recognizer = None
+        self.logger.info("STT resources released")
@@ -0,0 +1,128 @@
+import concurrent.futures
+import logging
+import threading
+import time
+
+
+class StartupLoader:
+    """
+    Builds components concurrently and records where startup time went.
+
+    Components that the wake word path needs are built in the caller's
+    thread with run(); slow ones (models, the frame cache) are handed to
+    submit() and load on a thread pool while the assistant is already
+    listening. Each component is built, then warmed up, and both times are
+    kept for the startup report. The report is logged once everything has
+    loaded and the "listening" milestone has been marked.
+    """
+
+    def __init__(self, workers: int = 4, started: float = None):
+        """
+        Args:
+            workers: Components loaded at the same time in the background
+            started: time.monotonic() when the process started (default: now)
+        """
+        self.logger = logging.getLogger("Startup")
+        self.started = time.monotonic() if started is None else started
+        self.timings = {}
+        self.milestones = {}
+        self.futures = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="startup")
+        self._reported = False
+
+    def _build(self, name: str, build, warm_up=None):
+        start = time.monotonic()
+        component = build()
+        built = time.monotonic()
+        if warm_up is not None and component is not None:
+            try:
+                warm_up(component)
+            except Exception as e:
+                self.logger.warning(f"{name} warm-up failed: {e}")
+        end = time.monotonic()
+        with self._lock:
+            self.timings[name] = {
+                "start": start - self.started,
+                "build": built - start,
+                "warm_up": end - built,
+                "ready": end - self.started,
+            }
+        return component
+
+    def run(self, name: str, build, warm_up=None):
+        """Build (and warm up) a component in this thread"""
+        return self._build(name, build, warm_up)
+
+    def submit(self, name: str, build, warm_up=None, on_ready=None) -> concurrent.futures.Future:
+        """
+        Build a component in the background.
+
+        Args:
+            name: Component name for the report
+            build: Callable returning the component
+            warm_up: Optional callable run on the component once it is built
+            on_ready: Optional callable given the component when it is ready
+
+        Returns:
+            Future: Resolves to the component (or raises the build error)
+        """
+        def task():
+            try:
+                component = self._build(name, build, warm_up)
+            except Exception as e:
+                self.logger.error(f"Failed to load {name}: {e}")
+                raise
+            if on_ready is not None:
+                on_ready(component)
+            return component
+
+        future = self._executor.submit(task)
+        self.futures[name] = future
+        future.add_done_callback(lambda _: self._maybe_report())
+        return future
+
+    def mark(self, milestone: str):
+        """Record a point in startup, e.g. when the wake word starts listening"""
+        self.milestones[milestone] = time.monotonic() - self.started
+        self.logger.info(f"{milestone} after {self.milestones[milestone]:.2f}s")
+        self._maybe_report()
+
+    def pending(self) -> list:
+        return [name for name, future in self.futures.items() if not future.done()]
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until every background component has finished loading"""
+        done, not_done = concurrent.futures.wait(list(self.futures.values()), timeout=timeout)
+        return not not_done
+
+    def _maybe_report(self):
+        with self._lock:
+            if self._reported or self.pending() or "listening" not in self.milestones:
+                return
+            self._reported = True
+        self.log_report()
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "milestones": dict(self.milestones),
+                "components": {name: dict(t) for name, t in sorted(self.timings.items(), key=lambda t: t[1]["ready"])},
+                "total": max([t["ready"] for t in self.timings.values()] + list(self.milestones.values()), default=0.0),
+            }
+
+    def log_report(self):
+        report = self.report()
+        lines = [f"Startup finished in {report['total']:.2f}s"]
+        for milestone, at in report["milestones"].items():
+            lines.append(f"  {milestone:<12} at {at:6.2f}s")
+        for name, t in report["components"].items():
+            lines.append(
+                f"  {name:<12} ready {t['ready']:6.2f}s "
+                f"(started {t['start']:.2f}s, build {t['build']:.2f}s, warm-up {t['warm_up']:.2f}s)"
+            )
+        self.logger.info("\n".join(lines))
+
+    def shutdown(self):
+        """Wait for loads in progress (so they can be cleaned up) and stop the pool"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,278 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def _worker_main(config: dict, requests, results):
+    """Worker process: load the model once, then transcribe from shared memory"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    from modules.speech_to_text import SpeechToText
+
+    start = time.monotonic()
+    stt = SpeechToText(config)
+    load_time = time.monotonic() - start
+    warmup_time = stt.warm_up()
+    results.put(("ready", None, {"load_time": load_time, "warmup_time": warmup_time, "pid": os.getpid()}))
+
+    segment = None
+    try:
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+            request_id, shm_name, n_samples, sample_rate, vad_filter, sent_at = message
+            picked_up = time.monotonic()
+            results.put(("started", request_id, None))
+            try:
+                if segment is None or segment.name != shm_name:
+                    # The parent grew the buffer; let go of the old block so it can be freed
+                    if segment is not None:
+                        segment.close()
+                        segment = None
+                    segment = shared_memory.SharedMemory(name=shm_name)
+                # Copy out of the parent's buffer (no audio is pickled): once a request is
+                # cancelled the parent reuses the block while this decode is still running
+                audio = np.array(np.ndarray((n_samples,), dtype=np.int16, buffer=segment.buf))
+                text = stt.transcribe(audio, sample_rate, vad_filter=vad_filter)
+                results.put(("result", request_id, {
+                    "text": text,
+                    "queue_wait": picked_up - sent_at,
+                    "decode_time": time.monotonic() - picked_up,
+                    "decode": stt.last_decode,
+                    "stats": stt.get_stats(),
+                }))
+            except Exception as e:
+                results.put(("error", request_id, {"error": str(e)}))
+    finally:
+        if segment is not None:
+            segment.close()
+        stt.cleanup()
+
+
+class STTWorker:
+    """
+    Runs SpeechToText in a separate process.
+
+    Decoding no longer freezes the main loop or competes with the display
+    thread for the GIL, and the model's memory lives in the worker. Audio is
+    handed over through a reusable ``multiprocessing.shared_memory`` block;
+    only small control messages go through the queues. The worker is
+    restarted automatically if it dies or stops answering. A request can be
+    cancelled: the caller gets "" at once, the worker finishes the decode it
+    is on and its late reply is dropped as stale, so the model stays loaded.
+    The timeout of the next request starts once the worker picks it up, not
+    while it waits behind that stale decode.
+
+    Exposes the same transcribe()/cleanup() interface as SpeechToText.
+    """
+
+    streaming = False
+
+    def __init__(self, config: dict):
+        """
+        Start the worker process (the model loads in the background).
+
+        Args:
+            config: STT configuration from config.yaml
+        """
+        self.logger = logging.getLogger("STTWorker")
+        self.config = config
+        self.timeout = config.get("worker_timeout", 30.0)
+        self.sample_rate = 16000
+        self.last_timing = {}
+        self.last_decode = {}
+        self._stats = {}
+        self.restarts = 0
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._cancelled_id = 0
+        self._request_id = 0
+        self._shm = None
+        self._ensure_capacity(int(config.get("worker_max_seconds", 30.0) * self.sample_rate))
+        self._start()
+
+    def _start(self):
+        self._requests = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._ready = False
+        self.process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.config, self._requests, self._results),
+            name="stt-worker",
+            daemon=True
+        )
+        # (request id, time) the worker picked up its current request, and when it last finished one
+        self._busy = None
+        self._idle_since = time.monotonic()
+        self.process.start()
+        self.logger.info(f"STT worker started (pid {self.process.pid})")
+
+    def _restart(self, reason: str):
+        self.logger.warning(f"Restarting STT worker: {reason}")
+        # The worker is stuck or gone; don't wait for a graceful exit
+        self._stop_process(graceful=False)
+        self.restarts += 1
+        self._start()
+
+    def _stop_process(self, timeout: float = 2.0, graceful: bool = True):
+        if graceful and self.process.is_alive():
+            try:
+                self._requests.put(None)
+            except Exception:
+                pass
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout)
+
+    def _ensure_capacity(self, n_samples: int):
+        """(Re)allocate the shared audio block if it is too small"""
+        needed = n_samples * 2
+        if self._shm is not None and self._shm.size >= needed:
+            return
+        if self._shm is not None:
+            self._shm_samples = None
+            self._shm.close()
+            self._shm.unlink()
+        self._shm = shared_memory.SharedMemory(create=True, size=needed)
+        self._shm_samples = np.ndarray((self._shm.size // 2,), dtype=np.int16, buffer=self._shm.buf)
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Block until the worker has loaded its model"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._ready:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if not self._poll(min(0.5, remaining) if remaining is not None else 0.5):
+                if not self.process.is_alive():
+                    return False
+        return True
+
+    def _poll(self, timeout: float):
+        """Read one message from the worker; returns it or None"""
+        try:
+            kind, request_id, payload = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if kind == "started":
+            self._busy = (request_id, time.monotonic())
+        elif kind in ("result", "error"):
+            self._busy = None
+            self._idle_since = time.monotonic()
+        elif kind == "ready":
+            self._ready = True
+            self.logger.info(
+                f"STT worker ready (model load {payload['load_time']:.2f}s, "
+                f"warm-up {payload['warmup_time']:.2f}s, pid {payload['pid']})"
+            )
+        return kind, request_id, payload
+
+    def transcribe(self, audio_data, sample_rate: int = 16000, vad_filter: bool = True,
+                   stop: threading.Event = None) -> str:
+        """
+        Transcribe int16 PCM in the worker process.
+
+        Args:
+            audio_data: Raw int16 PCM as bytes or a NumPy int16 array
+            sample_rate: Audio sample rate (default 16000)
+            vad_filter: Run Whisper's own VAD first (see SpeechToText.transcribe)
+            stop: Optional event that cancels this request once set, even
+                if it is set before the call starts
+
+        Returns:
+            str: Transcribed text ("" on failure, timeout or cancellation)
+        """
+        if audio_data is None or len(audio_data) == 0:
+            return ""
+
+        with self._lock:
+            if stop is not None and stop.is_set():
+                return ""
+            if not self.process.is_alive():
+                self._restart("worker not running")
+
+            started = time.monotonic()
+            samples = np.frombuffer(audio_data, dtype=np.int16)
+            self._ensure_capacity(len(samples))
+            self._shm_samples[:len(samples)] = samples
+
+            self._request_id += 1
+            request_id = self._request_id
+            self._requests.put((request_id, self._shm.name, len(samples), sample_rate, vad_filter, time.monotonic()))
+
+            while True:
+                if self._cancelled_id == request_id or (stop is not None and stop.is_set()):
+                    self.logger.info(f"Transcription request {request_id} cancelled")
+                    return ""
+                # The timeout covers one decode: ours once picked up, or a cancelled one still
+                # running ahead of it; nothing counts while the model is loading
+                if not self._ready:
+                    deadline = time.monotonic() + self.timeout
+                elif self._busy is not None:
+                    deadline = self._busy[1] + self.timeout
+                else:
+                    deadline = max(started, self._idle_since) + self.timeout
+                message = self._poll(0.1)
+                if message is None:
+                    if not self.process.is_alive():
+                        self._restart(f"worker exited with code {self.process.exitcode}")
+                        return ""
+                    if self._ready and time.monotonic() > deadline:
+                        self._restart(f"no result after {self.timeout:.0f}s")
+                        return ""
+                    continue
+
+                kind, reply_id, payload = message
+                if reply_id != request_id:
+                    continue  # stale reply from an earlier, abandoned request
+                if kind == "error":
+                    self.logger.error(f"Transcription failed in worker: {payload['error']}")
+                    return ""
+                if kind == "result":
+                    payload["total_time"] = time.monotonic() - started
+                    payload["audio_seconds"] = len(samples) / sample_rate
+                    text = payload.pop("text")
+                    self.last_decode = payload.pop("decode", {})
+                    self._stats = payload.pop("stats", {})
+                    self.last_timing = payload
+                    self.logger.info(
+                        f"Transcription: '{text}' (decode {payload['decode_time']:.2f}s, "
+                        f"total {payload['total_time']:.2f}s)"
+                    )
+                    return text
+
+    def warm_up(self, timeout: float = None) -> bool:
+        """The worker warms its model up itself before reporting ready; this waits for that"""
+        return self.wait_ready(timeout)
+
+    def get_stats(self) -> dict:
+        """Decode/cascade statistics as of the worker's latest result"""
+        return dict(self._stats, restarts=self.restarts)
+
+    def cancel(self):
+        """
+        Abandon the in-flight transcription, if any. A request that has not
+        started yet is not affected; pass ``stop`` to transcribe() for that.
+        """
+        self._cancelled_id = self._request_id
+
+    def cleanup(self):
+        """Stop the worker and release the shared memory block"""
+        self._stop_process()
+        if self._shm is not None:
+            self._shm_samples = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        self.logger.info("STT worker stopped")
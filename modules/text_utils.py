@@ -0,0 +1,107 @@
+import re
+import unicodedata
+
+# Sentence end: terminal punctuation (optionally closed by a quote/bracket) then whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
+# Clause boundary used to break up long sentences
+_CLAUSE_END = re.compile(r"(?<=[,;:—])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class SentenceChunker:
+    """
+    Splits incrementally arriving text into sentence-sized chunks.
+
+    Text is buffered until a sentence boundary followed by whitespace has
+    been seen, so "3.5" or a trailing "." without a following token are not
+    split early. Sentences longer than ``max_chars`` are broken at clause
+    boundaries (or between words, for a clause that is itself too long) so
+    no chunk exceeds ``max_chars`` and the first one reaches TTS quickly.
+    """
+
+    def __init__(self, max_chars: int = 150):
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> list:
+        """
+        Add text and return any chunks that are now complete.
+
+        Args:
+            text: Next fragment of the stream
+
+        Returns:
+            list[str]: Complete chunks, in order (may be empty)
+        """
+        self.buffer += text
+        chunks = []
+        while True:
+            match = _SENTENCE_END.search(self.buffer)
+            if match is None:
+                break
+            chunks.extend(self._split_long(self.buffer[:match.start() + len(match.group(0).rstrip())]))
+            self.buffer = self.buffer[match.end():]
+
+        # A very long run without a sentence end: emit up to the last clause break
+        if len(self.buffer) > self.max_chars:
+            clauses = list(_CLAUSE_END.finditer(self.buffer))
+            if clauses:
+                cut = clauses[-1]
+                chunks.extend(self._split_long(self.buffer[:cut.start()]))
+                self.buffer = self.buffer[cut.end():]
+        return [c for c in chunks if c]
+
+    def flush(self) -> list:
+        """Return whatever is left in the buffer as final chunk(s)"""
+        rest, self.buffer = self.buffer, ""
+        return [c for c in self._split_long(rest) if c]
+
+    def _split_long(self, sentence: str) -> list:
+        sentence = sentence.strip()
+        if len(sentence) <= self.max_chars:
+            return [sentence]
+        parts = []
+        current = ""
+        for piece in self._pieces(sentence):
+            if current and len(current) + len(piece) + 1 > self.max_chars:
+                parts.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+        if current:
+            parts.append(current)
+        return parts
+
+    def _pieces(self, sentence: str) -> list:
+        """Clauses of ``sentence``, with any clause over ``max_chars`` split into words"""
+        pieces = []
+        for clause in _CLAUSE_END.split(sentence):
+            if len(clause) <= self.max_chars:
+                pieces.append(clause)
+            else:
+                for word in _WHITESPACE.split(clause):
+                    pieces.extend(word[i:i + self.max_chars] for i in range(0, len(word), self.max_chars))
+        return pieces
+
+
+def split_sentences(text: str, max_chars: int = 150) -> list:
+    """Split a complete text into sentence-sized chunks"""
+    chunker = SentenceChunker(max_chars)
+    return chunker.feed(text) + chunker.flush()
+
+
+# Words that carry no meaning in a spoken query
+_FILLERS = {"um", "uh", "er", "erm", "hmm"}
+_NON_WORD = re.compile(r"[^\w' ]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Reduce a transcript to a canonical form for matching.
+
+    Lowercases, unifies apostrophes, drops punctuation and filler words and
+    collapses whitespace, so "Thank you!" and "thank you" compare equal.
+    """
+    text = unicodedata.normalize("NFKC", text).lower().replace("’", "'")
+    words = _NON_WORD.sub(" ", text).split()
+    return " ".join(w.strip("'") for w in words if w.strip("'") and w not in _FILLERS)
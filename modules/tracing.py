@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+# (stage, start event, end event); a stage is recorded when both events are present
+STAGES = [
+    ("wake_to_speech", "wake", "speech_start"),
+    ("speech", "speech_start", "endpoint"),
+    ("stt", "endpoint", "stt_done"),
+    ("llm_first_byte", "stt_done", "llm_first_byte"),
+    ("llm_first_text", "stt_done", "llm_first_text"),
+    ("llm_total", "stt_done", "llm_done"),
+    ("response_latency", "endpoint", "tts_first_audio"),
+    ("playback", "tts_first_audio", "playback_end"),
+    ("turn", "wake", "playback_end"),
+]
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Trace:
+    """Monotonic timestamps for the events of one interaction"""
+
+    def __init__(self, trace_id: str = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.wall_start = time.time()
+        self.start = time.monotonic()
+        self.events = {}
+        self.attrs = {}
+
+    def mark(self, event: str, at: float = None):
+        """Record ``event`` now, or at monotonic time ``at``. The first mark wins."""
+        if event not in self.events:
+            self.events[event] = time.monotonic() if at is None else at
+
+    def stages(self) -> dict:
+        """Stage durations in seconds"""
+        return {
+            name: self.events[end] - self.events[start]
+            for name, start, end in STAGES
+            if start in self.events and end in self.events
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "start": self.wall_start,
+            "events_ms": {k: round((t - self.start) * 1000, 2) for k, t in sorted(self.events.items(), key=lambda e: e[1])},
+            "stages_ms": {k: round(v * 1000, 2) for k, v in self.stages().items()},
+            **self.attrs,
+        }
+
+
+class Tracer:
+    """
+    Collects finished traces.
+
+    Each trace is appended to a JSONL file, and rolling p50/p95/p99 per
+    stage over the last ``window`` turns are rewritten to a Prometheus
+    text-format file after every turn, for a local node_exporter textfile
+    collector or any scraper that reads the format. Marking events is a
+    dict insert; all file I/O happens once per turn.
+    """
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: tracing section from config.yaml
+        """
+        self.logger = logging.getLogger("Tracer")
+        self.trace_file = config.get("trace_file", "logs/traces.jsonl")
+        self.metrics_file = config.get("metrics_file", "logs/metrics.prom")
+        self.window = config.get("window", 200)
+
+        self.turns = 0
+        self.cancelled = 0
+        self._samples = {name: deque(maxlen=self.window) for name, _, _ in STAGES}
+        self._counts = {name: 0 for name, _, _ in STAGES}
+        self._sums = {name: 0.0 for name, _, _ in STAGES}
+        self._lock = threading.Lock()
+
+    def start(self) -> Trace:
+        return Trace()
+
+    def finish(self, trace: Trace):
+        """Record a completed (or cancelled) trace"""
+        stages = trace.stages()
+        with self._lock:
+            self.turns += 1
+            if trace.attrs.get("cancelled"):
+                self.cancelled += 1
+            for name, value in stages.items():
+                self._samples[name].append(value)
+                self._counts[name] += 1
+                self._sums[name] += value
+
+        summary = ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in stages.items())
+        self.logger.info(f"Trace {trace.trace_id}: {summary}")
+        try:
+            os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+            with open(self.trace_file, "a") as f:
+                f.write(json.dumps(trace.to_dict()) + "\n")
+            self.write_metrics()
+        except OSError as e:
+            self.logger.warning(f"Could not write trace/metrics: {e}")
+
+    def percentiles(self) -> dict:
+        """{stage: {quantile: seconds}} over the rolling window"""
+        result = {}
+        with self._lock:
+            for name, samples in self._samples.items():
+                if samples:
+                    ordered = sorted(samples)
+                    result[name] = {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+        return result
+
+    def write_metrics(self):
+        lines = [
+            "# HELP assistant_stage_latency_seconds Per-stage latency over the last turns",
+            "# TYPE assistant_stage_latency_seconds summary",
+        ]
+        percentiles = self.percentiles()
+        with self._lock:
+            for name, _, _ in STAGES:
+                for q, value in percentiles.get(name, {}).items():
+                    lines.append(f'assistant_stage_latency_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'assistant_stage_latency_seconds_sum{{stage="{name}"}} {self._sums[name]:.6f}')
+                lines.append(f'assistant_stage_latency_seconds_count{{stage="{name}"}} {self._counts[name]}')
+            lines += [
+                "# HELP assistant_turns_total Interactions traced",
+                "# TYPE assistant_turns_total counter",
+                f"assistant_turns_total {self.turns}",
+                "# HELP assistant_turns_cancelled_total Interactions cut short by barge-in",
+                "# TYPE assistant_turns_cancelled_total counter",
+                f"assistant_turns_cancelled_total {self.cancelled}",
+            ]
+
+        os.makedirs(os.path.dirname(self.metrics_file) or ".", exist_ok=True)
+        tmp_path = f"{self.metrics_file}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        # Atomic replace so a scraper never reads a half-written file
+        os.replace(tmp_path, self.metrics_file)
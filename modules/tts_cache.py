@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PCMCache:
+    """
+    On-disk cache of synthesized speech.
+
+    Each entry is a raw int16 file named after a hash of (text, voice model,
+    speed, sample rate). Hits are read fully into memory: playback reads
+    clips from the real-time audio callback, where a page fault on the SD
+    card would cause an underrun. The total size is bounded; the least
+    recently used files are deleted first, with recency kept in the file
+    mtimes so it survives restarts.
+    """
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: tts.cache section from config.yaml
+        """
+        self.logger = logging.getLogger("PCMCache")
+        self.directory = config.get("path") or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "tts"
+        )
+        self.max_bytes = int(config.get("max_mb", 50) * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self._total = 0
+        self._scan()
+
+    def _scan(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pcm"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        except OSError as e:
+            self.logger.warning(f"Could not read TTS cache {self.directory}: {e}")
+            return
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+        self.logger.info(f"TTS cache: {len(self._entries)} clips, {self._total / 1e6:.1f} MB")
+
+    @staticmethod
+    def key(text: str, model: str, speed: float, sample_rate: int) -> str:
+        ident = json.dumps([text.strip(), model, float(speed), int(sample_rate)])
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest() + ".pcm"
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Read a cached clip into memory, or return None on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        path = os.path.join(self.directory, key)
+        try:
+            os.utime(path)
+            return np.fromfile(path, dtype=np.int16)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Dropping unreadable TTS cache entry {key}: {e}")
+            self._remove(key)
+            return None
+
+    def put(self, key: str, samples: np.ndarray):
+        """Store a clip, evicting old ones to stay under the size limit"""
+        data = np.ascontiguousarray(samples, dtype=np.int16)
+        if data.nbytes == 0 or data.nbytes > self.max_bytes:
+            return
+        path = os.path.join(self.directory, key)
+        try:
+            tmp_path = f"{path}.tmp"
+            data.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not write TTS cache entry: {e}")
+            return
+
+        with self._lock:
+            self._total += data.nbytes - self._entries.pop(key, 0)
+            self._entries[key] = data.nbytes
+            evict = []
+            while self._total > self.max_bytes:
+                name, size = self._entries.popitem(last=False)
+                self._total -= size
+                evict.append(name)
+        for name in evict:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _remove(self, key: str):
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+        try:
+            os.remove(os.path.join(self.directory, key))
+        except OSError:
+            pass
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "clips": len(self._entries),
+            "bytes": self._total,
+        }
@@ -1,22 +1,28 @@
 import logging
 import os
+import queue
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 import wave
+from collections import deque
 
 import numpy as np
 
-try:
-    import sherpa_onnx
-except Exception:  # pragma: no cover - runtime import handling
-    sherpa_onnx = None
+from modules.text_utils import split_sentences
+from modules.tts_cache import PCMCache
 
 
 class TTSHandler:
     """
     Text-to-Speech handler using sherpa-onnx VITS models.
     Falls back to espeak-ng if sherpa-onnx isn't available.
+
+    Speech is pipelined per sentence: a worker synthesizes sentence N+1
+    while sentence N plays, so playback starts after the first sentence
+    instead of after the whole response.
     """
 
     def __init__(self, config: dict, audio_handler):
@@ -28,14 +34,24 @@ class TTSHandler:
         self.tts = None
         self.sample_rate = 22050
         self.espeak_path = None
+        # Per-chunk synthesis real-time factor (synth seconds / audio seconds)
+        self.rtf_history = deque(maxlen=config.get("rtf_history", 200))
+        self.model_id = ""
+        self.cache = None
+        self._synth_lock = threading.Lock()
 
         if self.engine == "sherpa-onnx":
+            try:
+                # Imported here rather than at module load: it is slow to import
+                import sherpa_onnx
+            except Exception:  # pragma: no cover - runtime import handling
+                sherpa_onnx = None
             if sherpa_onnx is None:
                 self.logger.warning("sherpa-onnx not available, falling back to espeak-ng")
                 self.engine = "espeak-ng"
             else:
                 try:
-                    self._init_sherpa()
+                    self._init_sherpa(sherpa_onnx)
                 except Exception as e:
                     self.logger.warning(f"Failed to initialize sherpa-onnx: {e}")
                     self.engine = "espeak-ng"
@@ -48,7 +64,7 @@ class TTSHandler:
             else:
                 self.available = True
 
-    def _init_sherpa(self):
+    def _init_sherpa(self, sherpa_onnx):
         model_path = self.config.get("model_path", "")
         if not model_path:
             raise ValueError("TTS model_path is not set")
@@ -87,16 +103,22 @@ class TTSHandler:
         tts_config = sherpa_onnx.OfflineTtsConfig(model=model_config)
         self.tts = sherpa_onnx.OfflineTts(tts_config)
         self.sample_rate = getattr(self.tts, "sample_rate", 22050)
+        self.model_id = os.path.basename(model_file)
         self.available = True
         self.logger.info("sherpa-onnx TTS initialized")
 
+        cache_config = self.config.get("cache") or {}
+        if cache_config.get("enabled", False):
+            self.cache = PCMCache(cache_config)
+
     def synthesize(self, text: str) -> np.ndarray | None:
         if not text or not self.available or self.engine != "sherpa-onnx":
             return None
 
         try:
             speed = self.config.get("speed", 1.0)
-            audio = self.tts.generate(text, sid=0, speed=speed)
+            with self._synth_lock:
+                audio = self.tts.generate(text, sid=0, speed=speed)
             samples = audio.samples
             if samples is None or len(samples) == 0:
                 return None
@@ -145,18 +167,161 @@ class TTSHandler:
     def speak(self, text: str) -> bool:
         if not text or not self.available or not self.audio:
             return False
+        return self.speak_stream([text])
 
-        if self.engine == "sherpa-onnx":
-            samples = self.synthesize(text)
-            if samples is None:
-                return False
-            self.audio.play_audio(samples, self.sample_rate, channels=1)
-            return True
+    def speak_stream(self, chunks, on_first_audio=None, stop: threading.Event = None) -> bool:
+        """
+        Speak text that may still be arriving.
+
+        Each chunk is split into sentences; a worker thread synthesizes them
+        into a bounded queue while this thread plays them back to back.
+
+        Args:
+            chunks: Iterable of text fragments (e.g. streamed LLM sentences)
+            on_first_audio: Optional callable run when the first audio is
+                handed to playback (used for latency tracing)
+            stop: Optional event; once set, nothing more is synthesized or
+                queued for playback (barge-in)
+
+        Returns:
+            bool: True if anything was spoken
+        """
+        if not self.available or not self.audio:
+            return False
 
         if self.engine == "espeak-ng":
-            return self._speak_espeak(text)
+            spoken = False
+            for chunk in chunks:
+                for sentence in split_sentences(chunk):
+                    if stop is not None and stop.is_set():
+                        return spoken
+                    if not spoken and on_first_audio:
+                        on_first_audio()
+                    spoken = self._speak_espeak(sentence) or spoken
+            return spoken
+
+        if self.engine != "sherpa-onnx":
+            return False
+
+        pending = queue.Queue(maxsize=self.config.get("pipeline_depth", 2))
+        done = threading.Event()
+
+        def cancelled():
+            return done.is_set() or (stop is not None and stop.is_set())
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    for sentence in split_sentences(chunk):
+                        if cancelled():
+                            return
+                        samples = self._synthesize_timed(sentence)
+                        if samples is not None and not cancelled():
+                            pending.put(samples)
+            except Exception as e:
+                self.logger.error(f"TTS pipeline failed: {e}")
+            finally:
+                pending.put(None)
+
+        def drain():
+            first = True
+            while True:
+                samples = pending.get()
+                # Sentences synthesized before a barge-in are dropped, not played
+                if samples is None or cancelled():
+                    return
+                if first and on_first_audio:
+                    on_first_audio()
+                first = False
+                yield samples
+
+        worker = threading.Thread(target=produce, daemon=True)
+        worker.start()
+        try:
+            played = self.audio.play_stream(drain(), self.sample_rate, channels=1)
+        finally:
+            # Unblock the worker if playback stopped early
+            done.set()
+            while worker.is_alive():
+                try:
+                    pending.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        return played > 0
+
+    def _synthesize_timed(self, text: str) -> np.ndarray | None:
+        """Synthesize one sentence, going through the PCM cache when enabled"""
+        key = None
+        if self.cache is not None:
+            key = PCMCache.key(text, self.model_id, self.config.get("speed", 1.0), self.sample_rate)
+            samples = self.cache.get(key)
+            if samples is not None:
+                return samples
+
+        start = time.perf_counter()
+        samples = self.synthesize(text)
+        if samples is None:
+            return None
+        elapsed = time.perf_counter() - start
+        rtf = elapsed / (len(samples) / self.sample_rate)
+        self.rtf_history.append(rtf)
+        self.logger.debug(f"Synthesized {len(text)} chars in {elapsed:.3f}s (RTF {rtf:.2f})")
+        if key is not None:
+            self.cache.put(key, samples)
+        return samples
+
+    def warm_up(self, background: bool = True):
+        """
+        Run one throwaway synthesis, so the first reply doesn't pay for
+        allocation, then pre-render the configured phrase list into the
+        PCM cache.
+
+        Phrases are split into sentences the same way speak_stream() does,
+        so the cached clips match what will be requested later.
+
+        Args:
+            background: Render in a daemon thread instead of blocking
+        """
+        if self.engine != "sherpa-onnx" or not self.available:
+            return
+        phrases = []
+        if self.cache is not None:
+            phrases = (self.config.get("cache") or {}).get("warmup_phrases") or []
+
+        def render():
+            start = time.perf_counter()
+            self.synthesize("Hello.")
+            rendered = 0
+            for phrase in phrases:
+                for sentence in split_sentences(phrase):
+                    key = PCMCache.key(sentence, self.model_id, self.config.get("speed", 1.0), self.sample_rate)
+                    if key in self.cache:
+                        continue
+                    samples = self.synthesize(sentence)
+                    if samples is not None:
+                        self.cache.put(key, samples)
+                        rendered += 1
+            self.logger.info(f"TTS warm-up: rendered {rendered} new clip(s) in {time.perf_counter() - start:.2f}s")
+
+        if background:
+            threading.Thread(target=render, name="tts-warmup", daemon=True).start()
+        else:
+            render()
 
-        return False
+    def get_stats(self) -> dict:
+        """Synthesis real-time factor over recent chunks, for sizing num_threads"""
+        cache = self.cache.get_stats() if self.cache else None
+        if not self.rtf_history:
+            return {"chunks": 0, "cache": cache}
+        rtf = np.array(self.rtf_history)
+        return {
+            "chunks": len(rtf),
+            "cache": cache,
+            "num_threads": self.config.get("num_threads", 2),
+            "rtf_mean": float(rtf.mean()),
+            "rtf_p95": float(np.percentile(rtf, 95)),
+            "rtf_max": float(rtf.max()),
+        }
 
     def cleanup(self):
         if self.tts is not None:
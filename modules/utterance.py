@@ -0,0 +1,100 @@
+import logging
+import threading
+
+import numpy as np
+
+
+class UtteranceConditioner:
+    """
+    Trims a recording to its speech and rejects recordings without any.
+
+    Works from what the VAD already computed while recording (per-frame
+    speech decisions and energies), so nothing is analysed twice. The
+    speech span starts where the VAD's decision went up, moved back by
+    its start delay, and ends where it went down, less the hangover. Each
+    end then extends while the energy stays above the noise floor, to keep
+    soft onsets and word endings, and gets a little padding. Recordings
+    with less than ``min_speech_seconds`` of speech never reach the
+    recognizer; speech in the pre-roll (the end of the wake word) does
+    not count. A trimmed recording has no long silences left, so
+    recognizer-side VAD can be skipped for it.
+    """
+
+    def __init__(self, config: dict, vad):
+        """
+        Args:
+            config: recording section from config.yaml
+            vad: The VoiceActivityDetector that produced the flags
+        """
+        self.logger = logging.getLogger("Utterance")
+        self.vad = vad
+        self.padding = config.get("trim_padding", 0.2)
+        self.min_speech_seconds = config.get("min_speech_seconds", 0.25)
+        self.last = {}
+
+        self._lock = threading.Lock()
+        self._stats = {"utterances": 0, "rejected": 0, "seconds_in": 0.0, "seconds_out": 0.0}
+
+    def condition(self, audio: np.ndarray, flags: np.ndarray, energy_db: np.ndarray,
+                  pre_roll_frames: int = 0) -> np.ndarray | None:
+        """
+        Trim ``audio`` to its speech.
+
+        Args:
+            audio: int16 samples returned by record_until_silence
+            flags: Per-frame speech decisions for ``audio`` (last_speech_flags)
+            energy_db: Per-frame energies for ``audio`` (last_energy_db)
+            pre_roll_frames: Leading frames that hold the wake word; speech
+                there does not count, though the span may extend into it
+
+        Returns:
+            np.ndarray | None: The speech span (a view of ``audio``), or
+            None if there is not enough speech to transcribe
+        """
+        sample_rate = self.vad.sample_rate
+        frame = self.vad.frame_size
+        seconds_in = len(audio) / sample_rate
+        n = min(len(flags), len(energy_db), len(audio) // frame)
+        skip = min(pre_roll_frames, n)
+        speech = np.flatnonzero(flags[skip:n]) + skip
+
+        if len(speech) * frame / sample_rate < self.min_speech_seconds:
+            self._record(seconds_in, 0.0, rejected=True)
+            self.last = {"speech": False, "seconds_in": seconds_in, "speech_seconds": len(speech) * frame / sample_rate}
+            self.logger.info(f"No speech in {seconds_in:.2f}s recording; skipping transcription")
+            return None
+
+        # Undo the VAD's decision delays, then follow the energy outwards
+        first = max(int(speech[0]) - self.vad.min_speech_frames, 0)
+        last = max(int(speech[-1]) - self.vad.hangover_frames, first)
+        loud = energy_db[:n] > self.vad.noise_floor_db + self.vad.stop_margin_db
+        while first > 0 and loud[first - 1]:
+            first -= 1
+        while last < n - 1 and loud[last + 1]:
+            last += 1
+
+        pad = int(self.padding * sample_rate)
+        start = max(first * frame - pad, 0)
+        end = min((last + 1) * frame + pad, len(audio))
+        trimmed = audio[start:end]
+
+        seconds_out = len(trimmed) / sample_rate
+        self._record(seconds_in, seconds_out, rejected=False)
+        self.last = {"speech": True, "seconds_in": seconds_in, "seconds_out": seconds_out,
+                     "start": start / sample_rate, "end": end / sample_rate}
+        self.logger.info(f"Trimmed recording {seconds_in:.2f}s -> {seconds_out:.2f}s "
+                         f"({start / sample_rate:.2f}-{end / sample_rate:.2f}s)")
+        return trimmed
+
+    def _record(self, seconds_in: float, seconds_out: float, rejected: bool):
+        with self._lock:
+            self._stats["utterances"] += 1
+            self._stats["rejected"] += rejected
+            self._stats["seconds_in"] += seconds_in
+            self._stats["seconds_out"] += seconds_out
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["kept_ratio"] = stats["seconds_out"] / stats["seconds_in"] if stats["seconds_in"] else 1.0
+        return stats
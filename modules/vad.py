@@ -0,0 +1,133 @@
+import logging
+
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """
+    Adaptive energy/spectral voice-activity detector.
+
+    Features (log energy, zero-crossing rate, spectral flatness) are computed
+    for whole blocks of frames at once in NumPy. Only the small per-frame
+    state machine runs in Python: a noise floor that tracks the room,
+    separate start/continue thresholds (hysteresis), a minimum run of
+    speech frames to start and a hangover before speech is declared over.
+    """
+
+    def __init__(self, config: dict, sample_rate: int = 16000, frame_size: int = 512):
+        """
+        Args:
+            config: VAD configuration from config.yaml
+            sample_rate: Audio sample rate
+            frame_size: Samples per analysis frame (the capture chunk size)
+        """
+        self.logger = logging.getLogger("VAD")
+        self.config = config
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+
+        self.start_margin_db = config.get("start_margin_db", 12.0)
+        self.stop_margin_db = config.get("stop_margin_db", 6.0)
+        self.strong_margin_db = config.get("strong_margin_db", 25.0)
+        self.max_flatness = config.get("max_flatness", 0.45)
+        self.max_zcr = config.get("max_zcr", 0.35)
+        self.min_speech_frames = config.get("min_speech_frames", 3)
+        self.hangover_frames = config.get("hangover_frames", 4)
+        self.noise_rise_rate = config.get("noise_rise_rate", 0.02)
+        self.noise_fall_rate = config.get("noise_fall_rate", 0.3)
+        self.min_noise_db = config.get("min_noise_db", -70.0)
+        self.noise_floor_db = config.get("initial_noise_db", -50.0)
+
+        # Precomputed analysis window; reused for every block
+        self._window = np.hanning(frame_size).astype(np.float32)
+        self._remainder = np.zeros(0, dtype=np.int16)
+
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+
+        # Features of the most recent block, for callers that keep a track
+        self.last_energy_db = np.zeros(0, dtype=np.float32)
+
+    def reset_state(self):
+        """Forget the speech/silence state, keeping the noise floor and frame alignment"""
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+
+    def reset(self):
+        """Start a new segment: reset state and drop any partial frame"""
+        self.reset_state()
+        self._remainder = np.zeros(0, dtype=np.int16)
+
+    def features(self, frames: np.ndarray):
+        """
+        Compute per-frame features for a (n_frames, frame_size) int16 block.
+
+        Returns:
+            tuple: (energy_db, zcr, flatness) arrays of length n_frames
+        """
+        x = frames.astype(np.float32) * (1.0 / 32768.0)
+        energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+
+        signs = np.signbit(x)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_size - 1)
+
+        power = np.abs(np.fft.rfft(x * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return energy_db, zcr, flatness
+
+    def process(self, samples) -> np.ndarray:
+        """
+        Classify all complete frames in ``samples``.
+
+        Leftover samples are kept and prepended to the next call, so any
+        block size can be fed.
+
+        Args:
+            samples: int16 PCM (bytes or NumPy array)
+
+        Returns:
+            np.ndarray: One bool per completed frame (True = speech)
+        """
+        samples = np.frombuffer(samples, dtype=np.int16)
+        if len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+        n_frames = len(samples) // self.frame_size
+        self._remainder = samples[n_frames * self.frame_size:].copy()
+        if n_frames == 0:
+            self.last_energy_db = np.zeros(0, dtype=np.float32)
+            return np.zeros(0, dtype=bool)
+
+        frames = samples[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        energy_db, zcr, flatness = self.features(frames)
+        self.last_energy_db = energy_db
+
+        # Frame-level candidates need the running noise floor, so this part is sequential
+        decisions = np.zeros(n_frames, dtype=bool)
+        voiced = (flatness < self.max_flatness) & (zcr < self.max_zcr)
+        for i in range(n_frames):
+            margin = self.stop_margin_db if self.in_speech else self.start_margin_db
+            above = energy_db[i] - self.noise_floor_db
+            candidate = above > margin and (voiced[i] or above > self.strong_margin_db)
+
+            if candidate:
+                self._speech_run += 1
+                self._silence_run = 0
+                if not self.in_speech and self._speech_run >= self.min_speech_frames:
+                    self.in_speech = True
+            else:
+                self._speech_run = 0
+                self._silence_run += 1
+                if self.in_speech and self._silence_run > self.hangover_frames:
+                    self.in_speech = False
+                self._update_noise(energy_db[i])
+
+            decisions[i] = self.in_speech
+        return decisions
+
+    def _update_noise(self, energy_db: float):
+        # Follow drops quickly, rises slowly so speech does not drag the floor up
+        rate = self.noise_fall_rate if energy_db < self.noise_floor_db else self.noise_rise_rate
+        self.noise_floor_db += rate * (energy_db - self.noise_floor_db)
+        self.noise_floor_db = max(self.noise_floor_db, self.min_noise_db)
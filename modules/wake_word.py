@@ -1,60 +1,248 @@
-import pvporcupine
-import struct
 import logging
+import os
+
+import numpy as np
+
+
+class WakeWordBackend:
+    """
+    Interface for wake word engines.
+
+    Backends receive int16 frames of ``frame_length`` samples as NumPy views
+    (no per-frame unpacking) and return True on a detection.
+    """
+
+    name = "base"
+    frame_length = 512
+    sample_rate = 16000
+
+    def process(self, pcm: np.ndarray) -> bool:
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget any audio history (e.g. between replayed files)"""
+
+    def cleanup(self):
+        """Release engine resources"""
+
+
+class PorcupineBackend(WakeWordBackend):
+    """Picovoice Porcupine built-in keyword (needs an access key)"""
+
+    name = "porcupine"
+
+    def __init__(self, access_key: str, keyword: str, sensitivity: float = 0.5):
+        # Engines are imported by the backend that uses them, so only one is ever loaded
+        try:
+            import pvporcupine
+        except Exception:
+            raise RuntimeError("pvporcupine is not installed")
+        self.porcupine = pvporcupine.create(
+            access_key=access_key,
+            keywords=[keyword],
+            sensitivities=[sensitivity]
+        )
+        self.frame_length = self.porcupine.frame_length
+        self.sample_rate = self.porcupine.sample_rate
+
+    def process(self, pcm: np.ndarray) -> bool:
+        # pvporcupine iterates its input; a list of ints avoids one NumPy scalar per sample
+        return self.porcupine.process(pcm.tolist()) >= 0
+
+    def cleanup(self):
+        self.porcupine.delete()
+
+
+class OnnxKeywordBackend(WakeWordBackend):
+    """
+    Fully local keyword spotter running an ONNX classifier via onnxruntime.
+
+    Log-mel features (25 ms window, 10 ms hop) are computed incrementally
+    in NumPy and kept for the last ``window_seconds``. Every frame the model
+    scores that window; its input is (1, n_frames, n_mels), or
+    (1, 1, n_frames, n_mels) if the model declares four dimensions, and its
+    last output value is taken as the keyword probability.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, threshold: float = 0.5, frame_length: int = 512,
+                 window_seconds: float = 1.0, n_mels: int = 40, cooldown: float = 1.5,
+                 num_threads: int = 1):
+        try:
+            import onnxruntime
+        except Exception:
+            raise RuntimeError("onnxruntime is not installed")
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"Wake word model not found: {model_path}")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_rank = len(model_input.shape)
+
+        self.threshold = threshold
+        self.frame_length = frame_length
+        self.n_fft = 512
+        self.win_length = int(0.025 * self.sample_rate)
+        self.hop_length = int(0.010 * self.sample_rate)
+        self.n_mels = n_mels
+        self.window_frames = int(round(window_seconds * self.sample_rate / self.hop_length))
+        self.cooldown_frames = int(cooldown * self.sample_rate / frame_length)
+
+        self._window = np.hanning(self.win_length).astype(np.float32)
+        self._mel_basis = self._mel_filterbank()
+        self.reset()
+
+    def _mel_filterbank(self) -> np.ndarray:
+        def hz_to_mel(f):
+            return 2595.0 * np.log10(1.0 + f / 700.0)
+
+        def mel_to_hz(m):
+            return 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+
+        mel_points = np.linspace(hz_to_mel(20.0), hz_to_mel(self.sample_rate / 2), self.n_mels + 2)
+        bins = np.floor((self.n_fft + 1) * mel_to_hz(mel_points) / self.sample_rate).astype(int)
+        basis = np.zeros((self.n_mels, self.n_fft // 2 + 1), dtype=np.float32)
+        for m in range(1, self.n_mels + 1):
+            left, center, right = bins[m - 1], bins[m], bins[m + 1]
+            if center > left:
+                basis[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+            if right > center:
+                basis[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+        return basis
+
+    def reset(self):
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._features = np.zeros((self.window_frames, self.n_mels), dtype=np.float32)
+        self._filled = 0
+        self._cooldown = 0
+
+    def process(self, pcm: np.ndarray) -> bool:
+        samples = np.concatenate((self._tail, pcm.astype(np.float32) * (1.0 / 32768.0)))
+        n_frames = 1 + (len(samples) - self.win_length) // self.hop_length if len(samples) >= self.win_length else 0
+        if n_frames > 0:
+            # Strided view over overlapping windows, no copy until the FFT
+            frames = np.lib.stride_tricks.sliding_window_view(samples, self.win_length)[::self.hop_length][:n_frames]
+            power = np.abs(np.fft.rfft(frames * self._window, n=self.n_fft, axis=1)) ** 2
+            log_mel = np.log(power @ self._mel_basis.T + 1e-6)
+            self._features = np.roll(self._features, -n_frames, axis=0)
+            self._features[-n_frames:] = log_mel[-self.window_frames:]
+            self._filled = min(self.window_frames, self._filled + n_frames)
+        self._tail = samples[n_frames * self.hop_length:]
+
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False
+        if self._filled < self.window_frames:
+            return False
+
+        model_input = self._features[np.newaxis]
+        if self.input_rank == 4:
+            model_input = model_input[np.newaxis]
+        score = float(np.ravel(self.session.run(None, {self.input_name: model_input})[0])[-1])
+        if score >= self.threshold:
+            self._cooldown = self.cooldown_frames
+            return True
+        return False
+
+    def cleanup(self):
+        self.session = None
+
 
 class WakeWordDetector:
     """
-    Handles wake word detection using Picovoice Porcupine.
+    Handles wake word detection using a pluggable backend.
     Processes audio frames and returns True when wake word is detected.
+
+    Backends: "porcupine" (Picovoice, needs an access key) and "onnx"
+    (local keyword model run through onnxruntime, no key needed).
     """
-    
-    def __init__(self, access_key: str, keyword: str, sensitivity: float = 0.5):
+
+    def __init__(self, access_key: str = None, keyword: str = "computer", sensitivity: float = 0.5,
+                 backend: str = "porcupine", options: dict = None):
         """
-        Initialize Porcupine wake word detector.
-        
+        Initialize the wake word detector.
+
         Args:
-            access_key: Picovoice access key from console.picovoice.ai
+            access_key: Picovoice access key from console.picovoice.ai (porcupine only)
             keyword: Wake word (e.g., "computer", "jarvis")
             sensitivity: Detection sensitivity 0.0-1.0
+            backend: "porcupine" or "onnx"
+            options: Extra backend settings (wake_word section of config.yaml)
         """
         self.logger = logging.getLogger("WakeWord")
+        options = options or {}
         try:
-            self.porcupine = pvporcupine.create(
-                access_key=access_key,
-                keywords=[keyword],
-                sensitivities=[sensitivity]
-            )
-            self.logger.info(f"Porcupine initialized with keyword '{keyword}'")
+            if backend == "onnx":
+                self.backend = OnnxKeywordBackend(
+                    options.get("onnx_model_path", ""),
+                    threshold=options.get("threshold", sensitivity),
+                    window_seconds=options.get("window_seconds", 1.0),
+                    n_mels=options.get("n_mels", 40),
+                    cooldown=options.get("cooldown", 1.5),
+                    num_threads=options.get("num_threads", 1)
+                )
+            else:
+                self.backend = PorcupineBackend(access_key, keyword, sensitivity)
+            self.logger.info(f"Wake word backend '{self.backend.name}' initialized with keyword '{keyword}'")
         except Exception as e:
-            self.logger.error(f"Failed to initialize Porcupine: {e}")
+            self.logger.error(f"Failed to initialize wake word backend '{backend}': {e}")
             raise
 
-    def process_frame(self, audio_frame: bytes) -> bool:
+    @classmethod
+    def from_config(cls, config: dict) -> "WakeWordDetector":
+        """Build a detector from the wake_word section of config.yaml"""
+        return cls(
+            config.get("access_key"),
+            config.get("keyword", "computer"),
+            config.get("sensitivity", 0.5),
+            backend=config.get("backend", "porcupine"),
+            options=config
+        )
+
+    @property
+    def frame_length(self) -> int:
+        return self.backend.frame_length
+
+    def process_frame(self, audio_frame) -> bool:
         """
         Process a single audio frame (512 samples at 16kHz).
-        
+
         Args:
-            audio_frame: Raw audio bytes (512 samples * 2 bytes = 1024 bytes)
-            
+            audio_frame: int16 samples as a NumPy array or raw bytes
+
         Returns:
             True if wake word detected, False otherwise
         """
         try:
-            pcm = struct.unpack_from("h" * self.porcupine.frame_length, audio_frame)
-            keyword_index = self.porcupine.process(pcm)
-            if keyword_index >= 0:
+            pcm = np.frombuffer(audio_frame, dtype=np.int16)
+            if len(pcm) != self.backend.frame_length:
+                self.logger.error(f"Expected {self.backend.frame_length} samples, got {len(pcm)}")
+                return False
+            if self.backend.process(pcm):
                 self.logger.info("Wake word detected")
                 return True
             return False
-        except struct.error as e:
-            self.logger.error(f"Error unpacking audio frame: {e}")
-            return False
         except Exception as e:
             self.logger.error(f"Error processing frame: {e}")
             return False
 
+    def reset(self):
+        self.backend.reset()
+
+    def warm_up(self, seconds: float = 1.5):
+        """Run the engine over silence once, so the first real frames don't pay for allocation"""
+        silence = np.zeros(self.backend.frame_length, dtype=np.int16)
+        for _ in range(int(seconds * self.backend.sample_rate / self.backend.frame_length)):
+            self.backend.process(silence)
+        self.backend.reset()
+
     def cleanup(self):
-        """Release Porcupine resources"""
-        if hasattr(self, 'porcupine'):
-            self.porcupine.delete()
-            self.logger.info("Porcupine resources released")
+        """Release wake word resources"""
+        if hasattr(self, 'backend'):
+            self.backend.cleanup()
+            self.logger.info(f"Wake word resources released ({self.backend.name})")
@@ -33,7 +33,7 @@ def main():
             wf.setframerate(config["audio"]["sample_rate"])
             wf.writeframes(audio_data)
             
-        print(f"Saved {len(audio_data)} bytes. Playing back...")
+        print(f"Saved {audio_data.nbytes} bytes. Playing back...")
         os.system(f"aplay {filename}")
         
     except Exception as e:
@@ -0,0 +1,39 @@
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.frame_cache import FrameCache
+
+ANIMATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules", "animations")
+
+
+def main():
+    print("Testing frame compilation...")
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Frames compiled straight from the source GIFs must match those compiled from clean/,
+        # which is what the bundle was built from before thresholding moved into the compiler
+        compiled = FrameCache(ANIMATION_DIR, os.path.join(tmp, "source.bin"))
+        compiled.load(force=True)
+        reference = FrameCache(os.path.join(ANIMATION_DIR, "clean"), os.path.join(tmp, "clean.bin"))
+        reference.load(force=True)
+
+        print(f"Animations: {sorted(compiled.names())}")
+        ok &= sorted(compiled.names()) == sorted(reference.names())
+        for name in reference.names():
+            new, old = compiled.get(name), reference.get(name)
+            same = (len(new) == len(old) and new.durations == old.durations
+                    and all(a.tobytes() == b.tobytes() for a, b in zip(new.frames, old.frames)))
+            print(f"{name}: {len(new)} frames, {'identical' if same else 'DIFFERENT'}")
+            ok &= same
+
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
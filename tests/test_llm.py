@@ -0,0 +1,111 @@
+import sys
+import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import yaml
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.llm_handler import LLMHandler
+
+REPLY = '{"mood": "happy", "response": "Hello there! It is nice to talk to you. How can I help?"}'
+# Streamed as raw UTF-8 (no \u escapes, no charset), like the real API
+STREAM_REPLY = '{"mood": "happy", "response": "Café time — it’s nice to talk to you! 😊"}'
+
+
+class StubGroqHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible chat endpoint with keep-alive"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(0.05)  # pretend to think
+
+        if not body.get("stream"):
+            data = json.dumps({"choices": [{"message": {"content": REPLY}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(STREAM_REPLY), 8):
+            event = {"choices": [{"delta": {"content": STREAM_REPLY[i:i + 8]}}]}
+            self._chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            time.sleep(0.01)
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def load_config():
+    with open("config.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def main():
+    print("Testing LLM handler...")
+    # Pass --live to talk to the configured API instead of the local stub
+    live = "--live" in sys.argv
+
+    server = None
+    try:
+        config = load_config()["llm"]
+        # Every request should reach the API, and stub replies must not land in the real cache
+        config["response_cache"] = {"enabled": False}
+        if live:
+            config["api_key"] = os.getenv("GROQ_API_KEY", "")
+        else:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), StubGroqHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            config["base_url"] = f"http://127.0.0.1:{server.server_port}"
+            config["api_key"] = "test"
+            print(f"Stub server on {config['base_url']}")
+
+        llm = LLMHandler(config)
+        llm.prewarm()
+        time.sleep(0.5)
+
+        for i in range(3):
+            result = llm.generate_response("Hi there!")
+            print(f"Request {i + 1}: {result} {llm.transport.last_timing}")
+
+        print("Streaming...")
+        spoken = []
+        for kind, value in llm.stream_response("Tell me something nice."):
+            print(f"  {kind}: {value}")
+            if kind == "text":
+                spoken.append(value)
+        print(f"Timing: {llm.transport.last_timing}")
+        if not live:
+            expected = json.loads(STREAM_REPLY)["response"]
+            print("Non-ASCII stream: " + ("OK" if " ".join(spoken) == expected else f"MISMATCH {spoken!r}"))
+
+    except Exception as e:
+        print(f"Test failed: {e}")
+    finally:
+        if 'llm' in locals():
+            llm.cleanup()
+        if server:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.text_utils import SentenceChunker, split_sentences
+
+# The last sentence has no whitespace after its period, so it only leaves the chunker
+# through the long-buffer path or flush()
+TEXT = (
+    "Sure. Well, when you think about it, a ship that has every plank swapped out is still "
+    "sailing, still carrying its name, and still the ship people remember, so most would say "
+    "you did not replace it, you repaired it. But if someone rebuilt the old planks into a "
+    "second ship next to it, which one would you call the original, the one with the history "
+    "or the one with the wood, and why would your answer change if nobody had kept the planks."
+)
+
+
+def check(label: str, chunks: list, max_chars: int) -> bool:
+    longest = max(len(c) for c in chunks)
+    complete = " ".join(chunks).split() == TEXT.split()
+    print(f"{label}: {len(chunks)} chunks, longest {longest}/{max_chars}, text {'complete' if complete else 'LOST'}")
+    return longest <= max_chars and complete
+
+
+def main():
+    print("Testing sentence chunking...")
+    ok = True
+
+    for max_chars in (150, 60, 25):
+        ok &= check(f"split_sentences({max_chars})", split_sentences(TEXT, max_chars), max_chars)
+
+        # Streamed in small fragments, as the LLM delivers it
+        chunker = SentenceChunker(max_chars)
+        chunks = []
+        for i in range(0, len(TEXT), 7):
+            chunks.extend(chunker.feed(TEXT[i:i + 7]))
+        chunks.extend(chunker.flush())
+        ok &= check(f"streamed({max_chars})", chunks, max_chars)
+
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,53 @@
+import sys
+import os
+import types
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.orchestrator import Orchestrator
+from modules.tracing import Trace
+
+SAMPLE_RATE = 16000
+FRAME = 512
+
+
+def mark_speech(flags: list, pre_roll_frames: int) -> Trace:
+    """Run Orchestrator._mark_speech on a recording with the given per-frame VAD flags"""
+    audio = types.SimpleNamespace(
+        last_speech_flags=np.array(flags, dtype=bool),
+        last_pre_roll_frames=pre_roll_frames,
+        sample_rate=SAMPLE_RATE,
+    )
+    orchestrator = Orchestrator({}, {"audio": audio, "wake_word": None, "llm": None})
+    trace = Trace()
+    trace.mark("wake")
+    orchestrator._mark_speech(trace, np.zeros(len(flags) * FRAME, dtype=np.int16))
+    return trace
+
+
+def main():
+    print("Testing speech-start tracing...")
+    ok = True
+
+    # 10 pre-roll frames, the wake word flagged in the last 4 of them, the request starting at frame 16
+    flags = [0] * 6 + [1] * 4 + [0] * 6 + [1] * 20 + [0] * 10
+    trace = mark_speech(flags, pre_roll_frames=10)
+    expected = (len(flags) - 16) * FRAME / SAMPLE_RATE
+    measured = trace.events["endpoint"] - trace.events["speech_start"]
+    print(f"Speech start {measured:.3f}s before the endpoint (expected {expected:.3f}s)")
+    ok &= abs(measured - expected) < 1e-6
+
+    # Only the wake word in the pre-roll was flagged: no speech start at all
+    trace = mark_speech([1] * 10 + [0] * 30, pre_roll_frames=10)
+    print(f"Wake word only: speech_start {'missing' if 'speech_start' not in trace.events else 'set'}")
+    ok &= "speech_start" not in trace.events
+
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
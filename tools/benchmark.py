@@ -0,0 +1,531 @@
+"""
+End-to-end benchmark without hardware.
+
+Drives the real main.py pipeline (build_components + Orchestrator) with
+simulated devices:
+
+- a PyAudio stand-in whose input stream replays WAV files in real time and
+  whose output stream consumes playback in real time
+- a fake luma SSD1306 that counts the bytes it is sent
+- a scripted wake word that fires as each utterance starts playing
+- a local mock of the Groq chat endpoint with configurable latency
+
+Every utterance in the corpus is played once per --repeat, one turn at a
+time. The report has per-stage latency distributions (from the tracer), CPU
+time and peak RSS, and can be saved as JSON to compare commits.
+
+Usage:
+    python tools/benchmark.py --corpus data/bench
+    python tools/benchmark.py --corpus data/bench --fake-stt --fake-tts --llm-ttfb 0.4 --json bench.json
+
+The corpus is a folder of 16-bit WAV files. An optional transcripts.json
+({"file.wav": "what time is it"}) supplies the text --fake-stt returns.
+Speech-to-text and TTS use the configured models unless --fake-stt /
+--fake-tts replace them with fixed-delay stand-ins.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+import types
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+# --- Simulated microphone and speaker -------------------------------------
+
+class SimulatedRoom:
+    """What the microphone hears: low background noise plus queued utterances"""
+
+    def __init__(self, noise_level: float = 30.0, seed: int = 0):
+        self.noise_level = noise_level
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.pending = None
+        self.offset = 0
+        self.wake_pending = False
+
+    def say(self, samples: np.ndarray):
+        with self.lock:
+            self.pending = samples
+            self.offset = 0
+            # The keyword has just ended as the utterance starts
+            self.wake_pending = True
+
+    def read(self, n: int) -> np.ndarray:
+        block = (self.rng.standard_normal(n) * self.noise_level).astype(np.int16)
+        with self.lock:
+            if self.pending is not None:
+                take = min(n, len(self.pending) - self.offset)
+                block[:take] = self.pending[self.offset:self.offset + take]
+                self.offset += take
+                if self.offset >= len(self.pending):
+                    self.pending = None
+        return block
+
+
+class FakeStream:
+    """PyAudio stream driven by a real-time clock thread"""
+
+    def __init__(self, room, rate, frames_per_buffer, input=False, output=False, stream_callback=None, **kwargs):
+        self.room = room
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.input = input
+        self.callback = stream_callback
+        self.active = True
+        self.samples_out = 0
+        self._next = time.monotonic()
+        if stream_callback is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _tick(self):
+        self._next += self.frames_per_buffer / self.rate
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _run(self):
+        while self.active:
+            self._tick()
+            if self.input:
+                self.callback(self.room.read(self.frames_per_buffer).tobytes(), self.frames_per_buffer, {}, 0)
+            else:
+                data, _ = self.callback(None, self.frames_per_buffer, {}, 0)
+                self.samples_out += len(data) // 2
+
+    def read(self, n, exception_on_overflow=True):
+        self._tick()
+        return self.room.read(n).tobytes()
+
+    def is_active(self):
+        return self.active
+
+    def stop_stream(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+
+def install_fake_devices(room: SimulatedRoom, display_stats: dict):
+    """Register stand-ins for pyaudio and luma before the pipeline imports them"""
+    pyaudio = types.ModuleType("pyaudio")
+    pyaudio.paInt16 = 8
+    pyaudio.paContinue = 0
+    pyaudio.paInputOverflow = 2
+
+    class PyAudio:
+        def open(self, rate, frames_per_buffer=1024, **kwargs):
+            return FakeStream(room, rate, frames_per_buffer, **kwargs)
+
+        def get_device_info_by_index(self, index):
+            return {"index": index, "name": "simulated", "maxInputChannels": 1, "maxOutputChannels": 1}
+
+        def terminate(self):
+            pass
+
+    pyaudio.PyAudio = PyAudio
+
+    class SSD1306:
+        _const = types.SimpleNamespace(COLUMNADDR=0x21, PAGEADDR=0x22)
+        _colstart = 0
+
+        def __init__(self, serial_interface=None, width=128, height=64, **kwargs):
+            self.width = width
+            self.height = height
+            self.size = (width, height)
+            self.mode = "1"
+
+        def command(self, *args):
+            display_stats["bytes"] += len(args) + 1
+
+        def data(self, values):
+            display_stats["bytes"] += len(values)
+
+        def display(self, image):
+            display_stats["bytes"] += self.width * self.height // 8
+            display_stats["frames"] += 1
+
+        def clear(self):
+            pass
+
+        def contrast(self, level):
+            pass
+
+    @contextlib.contextmanager
+    def canvas(device):
+        from PIL import Image, ImageDraw
+        image = Image.new("1", device.size)
+        yield ImageDraw.Draw(image)
+        device.display(image)
+
+    modules = {
+        "pyaudio": pyaudio,
+        "luma": types.ModuleType("luma"),
+        "luma.core": types.ModuleType("luma.core"),
+        "luma.core.interface": types.ModuleType("luma.core.interface"),
+        "luma.core.interface.serial": types.ModuleType("luma.core.interface.serial"),
+        "luma.core.render": types.ModuleType("luma.core.render"),
+        "luma.oled": types.ModuleType("luma.oled"),
+        "luma.oled.device": types.ModuleType("luma.oled.device"),
+    }
+    modules["luma.core.interface.serial"].i2c = lambda port=1, address=0x3C: None
+    modules["luma.core.render"].canvas = canvas
+    modules["luma.oled.device"].ssd1306 = SSD1306
+    sys.modules.update(modules)
+
+
+# --- Scripted stand-ins ------------------------------------------------------
+
+class ScriptedWakeWord:
+    """Fires once each time the room starts playing an utterance"""
+
+    frame_length = 512
+
+    def __init__(self, room: SimulatedRoom):
+        self.room = room
+        self.backend = types.SimpleNamespace(sample_rate=16000)
+
+    def process_frame(self, frame) -> bool:
+        with self.room.lock:
+            if self.room.wake_pending:
+                self.room.wake_pending = False
+                return True
+        return False
+
+    def warm_up(self) -> float:
+        return 0.0
+
+    def reset(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+
+class ScriptedSTT:
+    """Returns the corpus transcript after a fixed decode delay"""
+
+    streaming = False
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.text = ""
+
+    def transcribe(self, audio_data, sample_rate: int = 16000, vad_filter: bool = True) -> str:
+        time.sleep(self.delay)
+        return self.text
+
+    def warm_up(self) -> float:
+        return 0.0
+
+    def get_stats(self) -> dict:
+        return {}
+
+    def cleanup(self):
+        pass
+
+
+class ScriptedTTS:
+    """Synthesizes silence: ``rtf`` seconds of compute per second of speech"""
+
+    available = True
+
+    def __init__(self, audio, rtf: float, seconds_per_char: float = 0.06):
+        self.audio = audio
+        self.rtf = rtf
+        self.seconds_per_char = seconds_per_char
+        self.sample_rate = 22050
+
+    def speak_stream(self, chunks, on_first_audio=None, stop=None) -> bool:
+        mark = None
+        for chunk in chunks:
+            if stop is not None and stop.is_set():
+                break
+            duration = len(chunk) * self.seconds_per_char
+            time.sleep(duration * self.rtf)
+            if mark is None and on_first_audio:
+                on_first_audio()
+            mark = self.audio.enqueue_audio(np.zeros(int(duration * self.sample_rate), dtype=np.int16), self.sample_rate)
+        if mark is not None:
+            self.audio.wait_playback(mark)
+        return mark is not None
+
+    def warm_up(self, background: bool = True):
+        pass
+
+    def cleanup(self):
+        pass
+
+
+# --- Mock Groq endpoint -------------------------------------------------------
+
+REPLIES = [
+    '{"mood": "happy", "response": "Sure! I can answer questions, tell you the time, and keep you company."}',
+    '{"mood": "curious", "response": "That is a good question. Let me think about it for a moment."}',
+    '{"mood": "neutral", "response": "Okay, I have noted that. Is there anything else you need?"}',
+]
+
+
+def start_mock_groq(ttfb: float, tokens_per_second: float) -> ThreadingHTTPServer:
+    counter = iter(range(1 << 30))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            reply = REPLIES[next(counter) % len(REPLIES)]
+            if "Previous summary" in body["messages"][0]["content"]:
+                reply = "The user asked a few general questions."
+            # Roughly 4 characters per token
+            tokens = [reply[i:i + 4] for i in range(0, len(reply), 4)]
+            time.sleep(ttfb)
+
+            if not body.get("stream"):
+                time.sleep(len(tokens) / tokens_per_second)
+                data = json.dumps({"choices": [{"message": {"content": reply}}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                event = {"choices": [{"delta": {"content": token}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                time.sleep(1.0 / tokens_per_second)
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- Harness -----------------------------------------------------------------
+
+def read_wav(path: str, sample_rate: int = 16000) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV is supported")
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        if wf.getnchannels() > 1:
+            samples = samples.reshape(-1, wf.getnchannels())[:, 0]
+    if rate != sample_rate:
+        n_out = int(len(samples) * sample_rate / rate)
+        samples = np.interp(np.arange(n_out) * rate / sample_rate, np.arange(len(samples)), samples).astype(np.int16)
+    return samples
+
+
+def load_corpus(folder: str) -> list:
+    transcripts = {}
+    transcripts_path = os.path.join(folder, "transcripts.json")
+    if os.path.exists(transcripts_path):
+        with open(transcripts_path, "r") as f:
+            transcripts = json.load(f)
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(".wav"))
+    return [(f, read_wav(os.path.join(folder, f)), transcripts.get(f, "what can you do")) for f in files]
+
+
+def distribution(values: list) -> dict:
+    ms = np.array(values) * 1000.0
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hardware-free end-to-end benchmark")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.yaml"))
+    parser.add_argument("--corpus", required=True, help="Folder of WAV utterances")
+    parser.add_argument("--repeat", type=int, default=1, help="Times to play the corpus")
+    parser.add_argument("--gap", type=float, default=1.0, help="Seconds of room noise between turns")
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    parser.add_argument("--llm-ttfb", type=float, default=0.3, help="Mock Groq time to first token (s)")
+    parser.add_argument("--llm-tps", type=float, default=200.0, help="Mock Groq tokens per second")
+    parser.add_argument("--fake-stt", action="store_true", help="Replace Whisper with a fixed-delay stand-in")
+    parser.add_argument("--stt-delay", type=float, default=0.5)
+    parser.add_argument("--fake-tts", action="store_true", help="Replace sherpa-onnx with a fixed-RTF stand-in")
+    parser.add_argument("--tts-rtf", type=float, default=0.3)
+    parser.add_argument("--out", default=os.path.join(ROOT, "logs", "benchmark"), help="Folder for traces/metrics")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    room = SimulatedRoom()
+    display_stats = {"bytes": 0, "frames": 0}
+    install_fake_devices(room, display_stats)
+
+    os.makedirs(os.path.join(ROOT, "logs"), exist_ok=True)  # main.py logs there on import
+    import main as app
+    from modules.orchestrator import Orchestrator
+    from modules.tracing import STAGES, Tracer
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No WAV files in {args.corpus}")
+        return
+
+    server = start_mock_groq(args.llm_ttfb, args.llm_tps)
+    config = app.load_config(args.config)
+    config["llm"].update(base_url=f"http://127.0.0.1:{server.server_port}", api_key="benchmark")
+    # Caches would turn repeated utterances into hits; measure the full pipeline
+    config["llm"].setdefault("response_cache", {})["enabled"] = False
+    config["tts"].setdefault("cache", {})["enabled"] = False
+    config["display"]["mood_duration"] = 0.0
+    config["tracing"] = {"enabled": True, "window": 100000,
+                         "trace_file": os.path.join(args.out, "traces.jsonl"),
+                         "metrics_file": os.path.join(args.out, "metrics.prom")}
+
+    turn_done = threading.Event()
+    traces = []
+
+    class BenchTracer(Tracer):
+        def finish(self, trace):
+            super().finish(trace)
+            traces.append(trace)
+            turn_done.set()
+
+    # The wake word is scripted; everything else is built exactly like main.py.
+    # With --fake-stt/--fake-tts the real models are never loaded, so no model files are needed
+    app.WakeWordDetector = types.SimpleNamespace(from_config=lambda cfg: ScriptedWakeWord(room))
+    if args.fake_stt:
+        app.SpeechToText = app.STTWorker = lambda cfg: ScriptedSTT(args.stt_delay)
+    if args.fake_tts:
+        app.TTSHandler = lambda cfg, audio: ScriptedTTS(audio, args.tts_rtf)
+    components = {}
+    cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.monotonic()
+    try:
+        if not app.build_components(config, components):
+            return
+        components["tracer"] = BenchTracer(config["tracing"])
+        # Measure a fully loaded pipeline
+        components["startup"].wait()
+        startup = time.monotonic() - wall_start
+
+        audio = components["audio"]
+        audio.start_input_stream()
+        audio.start_output_stream()
+
+        async def drive():
+            orchestrator = asyncio.create_task(Orchestrator(config, components).run())
+            loop = asyncio.get_running_loop()
+            for round_index in range(args.repeat):
+                for name, samples, text in corpus:
+                    await asyncio.sleep(args.gap)
+                    if isinstance(components["stt"], ScriptedSTT):
+                        components["stt"].text = text
+                    turn_done.clear()
+                    room.say(samples)
+                    if not await loop.run_in_executor(None, turn_done.wait, args.turn_timeout):
+                        print(f"{name}: turn timed out")
+                    else:
+                        print(f"{name} ({round_index + 1}/{args.repeat}): "
+                              f"{traces[-1].stages().get('response_latency', float('nan')) * 1000:.0f}ms to first audio")
+            orchestrator.cancel()
+            await asyncio.gather(orchestrator, return_exceptions=True)
+
+        asyncio.run(drive())
+    finally:
+        app.cleanup_components(components)
+        server.shutdown()
+
+    wall = time.monotonic() - wall_start
+    cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    stages = {name: [] for name, _, _ in STAGES}
+    for trace in traces:
+        for stage, value in trace.stages().items():
+            stages[stage].append(value)
+
+    report = {
+        "revision": git_revision(),
+        "corpus": os.path.abspath(args.corpus),
+        "utterances": len(corpus) * args.repeat,
+        "turns": len(traces),
+        "cancelled": sum(1 for t in traces if t.attrs.get("cancelled")),
+        "fake_stt": args.fake_stt,
+        "fake_tts": args.fake_tts,
+        "llm_ttfb": args.llm_ttfb,
+        "llm_tps": args.llm_tps,
+        "startup_s": startup,
+        "startup": components["startup"].report() if components.get("startup") else None,
+        "wall_s": wall,
+        "cpu_user_s": cpu_end.ru_utime - cpu_start.ru_utime,
+        "cpu_system_s": cpu_end.ru_stime - cpu_start.ru_stime,
+        "cpu_children_s": children.ru_utime + children.ru_stime,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": cpu_end.ru_maxrss / 1024,
+        "peak_rss_children_mb": children.ru_maxrss / 1024,
+        "audio_overflows": components["audio"].overflows if components.get("audio") else None,
+        "display_bytes": display_stats["bytes"],
+        "stages": {stage: distribution(values) for stage, values in stages.items() if values},
+    }
+
+    print("\n--- Benchmark ---")
+    for key, value in report.items():
+        if key in ("stages", "startup"):
+            continue
+        print(f"{key:>22}: {value:.4g}" if isinstance(value, float) else f"{key:>22}: {value}")
+    if report["startup"]:
+        # When each component was ready, counted from process start
+        ready = ", ".join(f"{name} {t['ready']:.2f}s" for name, t in report["startup"]["components"].items())
+        print(f"{'ready':>22}: {ready}")
+    print(f"\n{'stage':>18} {'n':>4} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for stage, d in report["stages"].items():
+        print(f"{stage:>18} {d['count']:>4} {d['mean_ms']:>8.1f} {d['p50_ms']:>8.1f} "
+              f"{d['p95_ms']:>8.1f} {d['p99_ms']:>8.1f} {d['max_ms']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Offline wake word benchmark.
+
+Streams WAV corpora through a wake word backend frame by frame and reports
+CPU per frame, detection latency and false accepts per hour.
+
+Usage:
+    python tools/wake_word_replay.py --positives data/kw --negatives data/noise
+    python tools/wake_word_replay.py --backend onnx --negatives data/tv --json report.json
+
+Positive files contain the wake word. Their keyword end times (seconds)
+can be given in a labels.json file in the same folder ({"file.wav": 1.23});
+without a label only the hit rate is reported for that file. Negative files
+must not contain the wake word: every detection there is a false accept.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+import yaml
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.wake_word import WakeWordDetector
+
+
+def load_config(path):
+    with open(path, "r") as f:
+        config = yaml.safe_load(f)
+    # Same ${VAR} expansion as main.py
+    key = config["wake_word"].get("access_key", "")
+    if isinstance(key, str) and key.startswith("${") and key.endswith("}"):
+        config["wake_word"]["access_key"] = os.getenv(key[2:-1], key)
+    return config
+
+
+def read_wav(path, sample_rate):
+    """Read a WAV file as mono int16 at ``sample_rate``"""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV is supported")
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        if wf.getnchannels() > 1:
+            samples = samples.reshape(-1, wf.getnchannels())[:, 0]
+    if rate != sample_rate:
+        n_out = int(len(samples) * sample_rate / rate)
+        samples = np.interp(np.arange(n_out) * rate / sample_rate, np.arange(len(samples)), samples).astype(np.int16)
+    return samples
+
+
+def list_wavs(folder):
+    if not folder:
+        return [], {}
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".wav"))
+    labels = {}
+    labels_path = os.path.join(folder, "labels.json")
+    if os.path.exists(labels_path):
+        with open(labels_path, "r") as f:
+            labels = json.load(f)
+    return files, labels
+
+
+def replay(detector, samples, frame_cpu):
+    """Stream one file through the detector; return detection times in seconds"""
+    frame_length = detector.frame_length
+    sample_rate = detector.backend.sample_rate
+    detector.reset()
+    detections = []
+    for start in range(0, len(samples) - frame_length + 1, frame_length):
+        frame = samples[start:start + frame_length]
+        t0 = time.process_time_ns()
+        hit = detector.process_frame(frame)
+        frame_cpu.append(time.process_time_ns() - t0)
+        if hit:
+            detections.append((start + frame_length) / sample_rate)
+    return detections
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV corpora through a wake word backend")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--backend", help="Override wake_word.backend")
+    parser.add_argument("--positives", help="Folder of WAVs containing the wake word")
+    parser.add_argument("--negatives", help="Folder of WAVs without the wake word")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Seconds before the labelled keyword end a detection still counts as a hit")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    ww_config = dict(config["wake_word"])
+    if args.backend:
+        ww_config["backend"] = args.backend
+    detector = WakeWordDetector.from_config(ww_config)
+    sample_rate = detector.backend.sample_rate
+
+    frame_cpu = []
+    latencies = []
+    hits = 0
+    false_accepts = 0
+    negative_false_accepts = 0
+    negative_seconds = 0.0
+
+    positives, labels = list_wavs(args.positives)
+    for path in positives:
+        samples = read_wav(path, sample_rate)
+        detections = replay(detector, samples, frame_cpu)
+        label = labels.get(os.path.basename(path))
+        print(f"{os.path.basename(path)}: {len(detections)} detection(s)")
+        if label is None:
+            hits += 1 if detections else 0
+            continue
+        # The first detection near/after the keyword end is the hit; anything else is a false accept
+        after = [t for t in detections if t >= label - args.tolerance]
+        if after:
+            hits += 1
+            latencies.append(after[0] - label)
+        false_accepts += len(detections) - (1 if after else 0)
+
+    negatives, _ = list_wavs(args.negatives)
+    for path in negatives:
+        samples = read_wav(path, sample_rate)
+        negative_seconds += len(samples) / sample_rate
+        detections = replay(detector, samples, frame_cpu)
+        false_accepts += len(detections)
+        negative_false_accepts += len(detections)
+        print(f"{os.path.basename(path)}: {len(detections)} false accept(s)")
+
+    detector.cleanup()
+
+    frame_us = np.array(frame_cpu) / 1000.0
+    frame_seconds = detector.frame_length / sample_rate
+    hours = negative_seconds / 3600.0
+    report = {
+        "backend": ww_config.get("backend", "porcupine"),
+        "frames": len(frame_us),
+        "cpu_us_per_frame_mean": float(frame_us.mean()) if len(frame_us) else None,
+        "cpu_us_per_frame_p95": percentile(frame_us, 95),
+        "cpu_load": float(frame_us.mean() / 1e6 / frame_seconds) if len(frame_us) else None,
+        "positives": len(positives),
+        "hit_rate": hits / len(positives) if positives else None,
+        "latency_ms_p50": percentile(np.array(latencies) * 1000, 50),
+        "latency_ms_p95": percentile(np.array(latencies) * 1000, 95),
+        "false_accepts": false_accepts,
+        "negative_hours": hours,
+        "false_accepts_per_hour": negative_false_accepts / hours if hours else None,
+    }
+
+    print("\n--- Wake word replay ---")
+    for key, value in report.items():
+        print(f"{key:>24}: {value:.4g}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()